@@ -0,0 +1,293 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable
+import numpy as np
+import pandas as pd
+from babel.numbers import format_currency
+from rich import print
+from rich.table import Table
+from rich.console import Console
+
+import make_report
+from make_report import CopyRightData, DEFAULT_PERIODS, CACHE_DIR, load_export, create_qmds
+from make_synthetic_data import make_synthetic_data
+
+'''
+Benchmarks the stages of the report pipeline on synthetic data of increasing size (see make_synthetic_data.py).
+For each size, every stage is timed and its peak memory (as seen by tracemalloc) is measured in a separate run.
+The results are written to a json file, so they can be compared between versions before a reporting cycle.
+
+With --check, the faster paths are compared with the ones they replace instead, on the same synthetic data:
+CurrencyFormatter with babel, the export read in chunks with one read of the whole file, the polars backend with the pandas one and the batch mode with the faculties loaded one by one.
+
+usage: python benchmark.py [--rows 10000 100000 1000000] [--output benchmark_results.json] [--check]
+'''
+
+# stage name -> (setup, run): setup prepares a fresh state outside the measurement, run is measured
+Stage = tuple[Callable[[], Any], Callable[[Any], Any]]
+
+
+def _reset_loaded_exports(clear_cache: bool = False) -> None:
+    make_report._loaded_exports.clear()
+    if clear_cache:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+def _loaded(faculty: str, compact: bool = False, backend: str = 'pandas') -> CopyRightData:
+    dataclass = CopyRightData(periods=DEFAULT_PERIODS, faculty=faculty, compact=compact, backend=backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        dataclass.get_data()
+    return dataclass
+
+def _with_faculty_data(faculty: str) -> CopyRightData:
+    dataclass = CopyRightData(periods=DEFAULT_PERIODS, faculty=faculty)
+    dataclass.faculty_data = load_export('copyright_export.csv', DEFAULT_PERIODS, dataclass.get_mapping()).get_faculty(faculty)
+    return dataclass
+
+def _calculate_stats(dataclass: CopyRightData) -> None:
+    dataclass.stats, dataclass.department_stats, dataclass.masks = {}, {}, pd.DataFrame()
+    dataclass.calculate_stats()
+    dataclass.get_department_stats()
+
+def _get_long_excerpts(dataclass: CopyRightData) -> None:
+    dataclass.get_long_excerpts(all=True)
+    dataclass.get_long_excerpts(all=False)
+    for department in dataclass.faculty_data['Department'].dropna().unique():
+        dataclass.get_long_excerpts(all=False, department=department)
+
+def _create_qmds(_: Any) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_qmds()
+
+def get_stages(faculty: str) -> dict[str, Stage]:
+    stages = {
+        'get_data (csv)': (lambda: _reset_loaded_exports(clear_cache=True), lambda _: _loaded(faculty)),
+        'get_data (cached)': (lambda: _reset_loaded_exports(), lambda _: _loaded(faculty)),
+        'get_data (compact)': (lambda: _reset_loaded_exports(), lambda _: _loaded(faculty, compact=True)),
+        'get_data (all faculties)': (lambda: _reset_loaded_exports(), lambda _: _loaded('')),
+        'add_student_sheet_data': (lambda: _with_faculty_data(faculty), lambda dataclass: dataclass.add_student_sheet_data()),
+        'calculate_stats': (lambda: _loaded(faculty), _calculate_stats),
+        'get_long_excerpts': (lambda: _loaded(faculty), _get_long_excerpts),
+        'create_qmds': (lambda: _reset_loaded_exports(), _create_qmds),
+    }
+    if make_report.pl is not None:
+        # the polars backend reads the cache written by the pandas stages, but doesn't write it: cached first
+        stages['get_data (polars, cached)'] = (lambda: _reset_loaded_exports(), lambda _: _loaded(faculty, backend='polars'))
+        stages['get_data (polars, csv)'] = (lambda: _reset_loaded_exports(clear_cache=True), lambda _: _loaded(faculty, backend='polars'))
+    return stages
+
+def measure(setup: Callable[[], Any], run: Callable[[Any], Any], memory: bool = True) -> dict[str, float | int | None]:
+    '''
+    returns the wall time of run(setup()) and, if memory is True, the peak memory of a second run under tracemalloc
+    '''
+    state = setup()
+    start = time.perf_counter()
+    run(state)
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        state = setup()
+        tracemalloc.start()
+        run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'seconds': seconds, 'peak_memory_bytes': peak}
+
+def run_benchmarks(sizes: list[int], memory: bool = True, workdir: str | None = None, **synthetic: Any) -> dict[str, Any]:
+    '''
+    generates synthetic data for every size in sizes and measures each stage in get_stages() on it.
+    synthetic is passed on to make_synthetic_data (faculties, departments, periods, ...)
+    '''
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for rows in sizes:
+            path = make_synthetic_data(output=os.path.join(tmp, str(rows)), rows=rows, **synthetic)
+            os.chdir(path)
+            try:
+                for stage, (setup, run) in get_stages(make_report.FACULTYNAMES[0]).items():
+                    result = {'rows': rows, 'stage': stage, **measure(setup, run, memory=memory)}
+                    print(f"{rows:>9} rows  {stage:<24} {result['seconds']:8.3f}s")
+                    results.append(result)
+            finally:
+                _reset_loaded_exports()
+                os.chdir(cwd)
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'synthetic': synthetic,
+        'results': results,
+    }
+
+# amounts around the edges of CurrencyFormatter: half cents, fractions that round differently in binary and amounts left to babel
+CURRENCY_EDGE_AMOUNTS = [0.0, 0.005, 0.015, 1.005, 2.675, 0.1 + 0.2, 1e-9, 1234.5, 123_456_789.125, 99_999_999_999.99, 1e11, 1e15]
+
+def check_currency_formatter(formatter: make_report.CurrencyFormatter = make_report.EURO_FORMATTER, samples: int = 10_000) -> list[str]:
+    '''
+    returns the amounts that formatter formats differently from babel's format_currency:
+    CURRENCY_EDGE_AMOUNTS, their negatives and samples random amounts
+    '''
+    random = np.round(np.random.default_rng(0).uniform(-1e7, 1e7, samples), 3)
+    amounts = pd.Series([*CURRENCY_EDGE_AMOUNTS, *(-amount for amount in CURRENCY_EDGE_AMOUNTS), *random], dtype='float64')
+    formatted = formatter.format(amounts)
+    failures = []
+    for amount, result in zip(amounts, formatted):
+        expected = format_currency(amount, currency=formatter.currency, locale=formatter.locale)
+        if result != expected:
+            failures.append(f'format({amount!r}) gives {result!r}, babel {expected!r}')
+    return failures
+
+def _frame_differences(name: str, expected: pd.DataFrame, result: pd.DataFrame) -> list[str]:
+    try:
+        pd.testing.assert_frame_equal(expected, result, check_exact=True)
+    except AssertionError as e:
+        return [f'{name}: ' + ' '.join(str(e).split())]
+    return []
+
+def _stats_differences(name: str, expected: dict[str, Any], result: dict[str, Any]) -> list[str]:
+    # the totals are sums of floats, which can differ in the last decimals depending on the order they are added in
+    if expected.keys() != result.keys() or not all(math.isclose(expected[key], result[key], rel_tol=1e-9) for key in expected):
+        return [f'{name}: {result} instead of {expected}']
+    return []
+
+def compare_dataclasses(expected: CopyRightData, result: CopyRightData) -> list[str]:
+    '''
+    returns the differences between the data, stats, long excerpts and department stats of two CopyRightData of the same faculty
+    '''
+    faculty = expected.get_faculty()
+    with contextlib.redirect_stdout(io.StringIO()):
+        programmes = expected.get_programme_list(), result.get_programme_list()
+    failures = _frame_differences(f'{faculty} data', expected.faculty_data, result.faculty_data)
+    failures += _stats_differences(f'{faculty} stats', dict(expected.get_stats()), dict(result.get_stats()))
+    for all in [True, False]:
+        failures += _frame_differences(f'{faculty} long excerpts (all={all})', expected.get_long_excerpts(all=all), result.get_long_excerpts(all=all))
+    if programmes[0] != programmes[1]:
+        failures.append(f'{faculty} programmes: {programmes[1]} instead of {programmes[0]}')
+    departments = expected.get_department_stats(), result.get_department_stats()
+    for department in departments[0].keys() | departments[1].keys():
+        failures += _stats_differences(f'{faculty} {department}', departments[0].get(department, {}), departments[1].get(department, {}))
+    return failures
+
+def check_chunked_read(filepath: str = 'copyright_export.csv') -> list[str]:
+    '''
+    returns the differences between read_export() in chunks and in one read of the whole export, for all periods in it:
+    with chunks of 1,000 rows and with a last chunk of 2 rows, as is and with those 2 rows without a manual classification or ML prediction
+    '''
+    export = pd.read_csv(filepath, dtype='str', keep_default_na=False)
+    periods = sorted(export['Period'].unique())
+    last_rows_empty = os.path.join(os.path.dirname(os.path.abspath(filepath)), 'last_rows_empty.csv')
+    export.iloc[-2:, export.columns.get_indexer(['Manual classification', 'ML Prediction'])] = ''
+    export.to_csv(last_rows_empty, index=False)
+    failures = []
+    try:
+        for path, chunksizes in [(filepath, [1_000, max(len(export) - 2, 1)]), (last_rows_empty, [max(len(export) - 2, 1)])]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = make_report.read_export(path, periods, chunksize=10**9)
+            for chunksize in chunksizes:
+                name = f'{os.path.basename(path)} in chunks of {chunksize} rows'
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        result = make_report.read_export(path, periods, chunksize=chunksize)
+                except Exception as e:
+                    failures.append(f'{name}: {e}')
+                    continue
+                failures += _frame_differences(name, expected, result)
+    finally:
+        os.remove(last_rows_empty)
+    return failures
+
+def check_backends(faculties: list[str]) -> list[str]:
+    '''
+    returns the differences between the polars and the pandas backend for faculties, from the csv and from the feather cache
+    '''
+    failures = []
+    for clear_cache in [True, False]:
+        _reset_loaded_exports(clear_cache=clear_cache)
+        for faculty in faculties:
+            # polars first, the pandas backend writes the cache
+            polars = _loaded(faculty, backend='polars')
+            failures += [f"{'csv' if clear_cache else 'cached'}: {failure}" for failure in compare_dataclasses(_loaded(faculty), polars)]
+    return failures
+
+def check_batch(faculties: list[str]) -> list[str]:
+    '''
+    returns the differences between the batch mode (see CopyRightData.for_faculty) and the faculties loaded one by one
+    '''
+    _reset_loaded_exports()
+    institution = _loaded('')
+    failures = []
+    for faculty in faculties:
+        result = institution.for_faculty(faculty)
+        if result is None:
+            failures.append(f'{faculty}: no batch result')
+            continue
+        failures += compare_dataclasses(_loaded(faculty), result)
+    return failures
+
+def run_checks(sizes: list[int], workdir: str | None = None, **synthetic: Any) -> list[str]:
+    '''
+    runs check_currency_formatter(), and check_chunked_read(), check_backends() (if polars is installed) and check_batch()
+    on synthetic data for every size in sizes.
+    returns the failures, an empty list if the outputs are the same
+    '''
+    failures = check_currency_formatter()
+    print(f"CurrencyFormatter: {len(failures)} differences")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for rows in sizes:
+            path = make_synthetic_data(output=os.path.join(tmp, str(rows)), rows=rows, **synthetic)
+            os.chdir(path)
+            try:
+                checks = {'chunked read': lambda _: check_chunked_read(), 'batch': check_batch}
+                if make_report.pl is not None:
+                    checks['polars backend'] = check_backends
+                for check, run in checks.items():
+                    found = [f'{rows} rows, {check}: {failure}' for failure in run(make_report.FACULTYNAMES)]
+                    print(f"{rows:>9} rows  {check:<24} {len(found)} differences")
+                    failures += found
+            finally:
+                _reset_loaded_exports()
+                os.chdir(cwd)
+    return failures
+
+def print_results(report: dict[str, Any]) -> None:
+    table = Table(title='Benchmark results')
+    for column in ['rows', 'stage', 'seconds', 'peak memory (MB)']:
+        table.add_column(column, justify='left' if column == 'stage' else 'right')
+    for result in report['results']:
+        peak = result['peak_memory_bytes']
+        table.add_row(str(result['rows']), result['stage'], f"{result['seconds']:.3f}", f'{peak / 2**20:.1f}' if peak is not None else '-')
+    Console().print(table)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark the report pipeline on synthetic data')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help='export sizes to benchmark')
+    parser.add_argument('--output', default='benchmark_results.json', help='json file to write the results to')
+    parser.add_argument('--no-memory', action='store_true', help='only measure time, skip the tracemalloc runs')
+    parser.add_argument('--departments', type=int, default=8, help='number of departments per faculty')
+    parser.add_argument('--periods', type=int, default=16, help='number of periods in the export')
+    parser.add_argument('--workdir', default=None, help='directory for the synthetic data (default: system temp dir)')
+    parser.add_argument('--check', action='store_true', help='check that the faster paths give the same output as the ones they replace, instead of timing them')
+    args = parser.parse_args()
+    if args.check:
+        failures = run_checks(args.rows, workdir=args.workdir, departments=args.departments, periods=args.periods)
+        for failure in failures:
+            print(f"  {failure}")
+        raise SystemExit(1 if failures else 0)
+    report = run_benchmarks(args.rows, memory=not args.no_memory, workdir=args.workdir, departments=args.departments, periods=args.periods)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print_results(report)
+    print(f"results written to {args.output}")
@@ -0,0 +1,169 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from rich import print
+
+from make_report import (FACULTYNAMES, DEFAULT_PERIODS, BACKENDS, add_profile_records, changed_faculties, create_qmd, enable_profiling, faculty_fingerprint,
+                         get_faculty_mapping, load_export, print_profile, profile_records, record_profile, save_dashboard_state, write_profile)
+
+'''
+Cross-platform version of make_dashboards.ps1: creates the Easy Access dashboard for each faculty.
+
+The qmd files are built in a process pool, one faculty per worker. As soon as the qmd for a faculty is done,
+quarto render + single-file are started for it as subprocesses, with at most render_workers running at the same time.
+A failing faculty is reported at the end and doesn't stop the others.
+With --incremental, faculties whose items and manual sheet didn't change since their last successful build are skipped.
+
+requirements: quarto (https://quarto.org/docs/get-started/) and single-file-cli (https://github.com/gildas-lormeau/single-file-cli) on the PATH,
+or passed with --quarto / --single-file.
+'''
+
+
+def build_qmd(faculty: str, periods: list[str], precompute: bool, compact: bool = False, profile: bool = False, backend: str = 'pandas',
+              paginate: bool = False) -> tuple[float, list[dict]]:
+    '''
+    runs in a worker process: creates dashboard_<faculty>.qmd and returns the time it took,
+    + the profile entries of the build if profile is True (see make_report.enable_profiling)
+    '''
+    if profile:
+        enable_profiling()
+    start = time.perf_counter()
+    create_qmd(faculty, periods, precompute=precompute, compact=compact, backend=backend, paginate=paginate)
+    return time.perf_counter() - start, profile_records(clear=True)
+
+def render_dashboard(faculty: str, quarto: str = 'quarto', single_file: str | None = 'single-file', keep_scripts: bool = False) -> float:
+    '''
+    renders dashboard_<faculty>.qmd with quarto and inlines the result into easy_access_<faculty>.html with single-file.
+    keep_scripts is needed for dashboards with paginated tables, single-file removes the scripts by default.
+    returns the time it took, raises an Exception with the output of the failing command.
+    '''
+    start = time.perf_counter()
+    commands = [[quarto, 'render', f'dashboard_{faculty}.qmd']]
+    if single_file:
+        cwd = os.getcwd()
+        commands.append([single_file, os.path.join(cwd, f'dashboard_{faculty}.html'), os.path.join(cwd, f'easy_access_{faculty}.html'),
+                         *(['--block-scripts', 'false'] if keep_scripts else [])])
+    for command in commands:
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            output = (result.stderr or result.stdout).strip().splitlines()[-5:]
+            raise Exception(f"{' '.join(command)} exited with code {result.returncode}: " + '\n'.join(output))
+    return time.perf_counter() - start
+
+def make_dashboards(faculties: list[str] | None = None,
+                    periods: list[str] | None = None,
+                    precompute: bool = True,
+                    build_workers: int | None = None,
+                    render_workers: int = 2,
+                    render: bool = True,
+                    quarto: str = 'quarto',
+                    single_file: str | None = 'single-file',
+                    incremental: bool = False,
+                    compact: bool = False,
+                    profile: str | None = None,
+                    backend: str = 'pandas',
+                    paginate: bool = False) -> dict[str, str]:
+    '''
+    builds, renders and inlines the dashboard for each faculty, see the module docstring.
+    if profile is a path, the time, rows and memory use of every stage per faculty (including the renders) are written to it.
+    returns the failures as {faculty: error message}
+    '''
+    faculties = faculties if faculties else FACULTYNAMES
+    periods = periods if periods else DEFAULT_PERIODS
+    failures: dict[str, str] = {}
+    start = time.perf_counter()
+    if profile:
+        enable_profiling()
+
+    # load the export once up front: this writes the feather cache the workers read from,
+    # and forked workers inherit the loaded export directly. the polars backend doesn't use the loaded export, it scans the csv or the cache itself
+    if backend != 'polars' or incremental:
+        try:
+            load_export('copyright_export.csv', periods, get_faculty_mapping(), compact=compact)
+        except Exception as e:
+            print(f"error loading copyright_export.csv: {e}")
+            return {faculty: str(e) for faculty in faculties}
+    stage = 'html' if render else 'qmd'
+    if incremental:
+        fingerprints = changed_faculties(faculties, periods, precompute=precompute, stage=stage, compact=compact, paginate=paginate)
+        print(f"unchanged, skipped: {', '.join(faculty for faculty in faculties if faculty not in fingerprints) or '-'}")
+        faculties = [faculty for faculty in faculties if faculty in fingerprints]
+    elif backend != 'polars':
+        fingerprints = {faculty: faculty_fingerprint(faculty, periods, precompute, compact=compact, paginate=paginate) for faculty in faculties}
+    else:
+        # these need the export loaded with pandas, the builds are recorded with --incremental only
+        fingerprints = {}
+
+    with ProcessPoolExecutor(max_workers=build_workers) as builders, ThreadPoolExecutor(max_workers=render_workers) as renderers:
+        builds: dict[Future, str] = {builders.submit(build_qmd, faculty, periods, precompute, compact, bool(profile), backend, paginate): faculty for faculty in faculties}
+        renders: dict[Future, str] = {}
+        for future in as_completed(builds):
+            faculty = builds[future]
+            try:
+                seconds, records = future.result()
+                add_profile_records(records)
+                print(f"{faculty}: qmd built in {seconds:.1f}s")
+            except Exception as e:
+                print(f"error building {faculty}: {e}")
+                failures[faculty] = f'build: {e}'
+                continue
+            if render:
+                renders[renderers.submit(render_dashboard, faculty, quarto, single_file, paginate)] = faculty
+            elif faculty in fingerprints:
+                save_dashboard_state(stage, {faculty: fingerprints[faculty]})
+        for future in as_completed(renders):
+            faculty = renders[future]
+            try:
+                seconds = future.result()
+                record_profile('render_dashboard', faculty, seconds, memory=False)
+                print(f"{faculty}: rendered in {seconds:.1f}s")
+                if faculty in fingerprints:
+                    save_dashboard_state(stage, {faculty: fingerprints[faculty]})
+            except Exception as e:
+                print(f"error rendering {faculty}: {e}")
+                failures[faculty] = f'render: {e}'
+
+    done = [faculty for faculty in faculties if faculty not in failures]
+    print(f"Done in {time.perf_counter() - start:.1f}s. {len(done)} of {len(faculties)} dashboards created: {', '.join(done) or '-'}")
+    for faculty, error in failures.items():
+        print(f"  failed: {faculty} -- {error}")
+    if profile:
+        write_profile(profile)
+        print_profile()
+        print(f"profile written to {profile}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='create the Easy Access dashboards, building and rendering the faculties in parallel')
+    parser.add_argument('--faculties', nargs='+', default=FACULTYNAMES, help='faculties to create a dashboard for (default: FACULTYNAMES in make_report.py)')
+    parser.add_argument('--periods', nargs='+', default=DEFAULT_PERIODS, help='periods to include')
+    parser.add_argument('--no-precompute', action='store_true', help='let quarto process the copyright data while rendering, instead of loading precomputed tables')
+    parser.add_argument('--build-workers', type=int, default=None, help='number of processes building qmd files (default: number of cpus)')
+    parser.add_argument('--render-workers', type=int, default=2, help='number of quarto renders running at the same time')
+    parser.add_argument('--no-render', action='store_true', help='only create the qmd files')
+    parser.add_argument('--quarto', default='quarto', help='quarto executable')
+    parser.add_argument('--single-file', default='single-file', help="single-file executable, or '' to skip inlining")
+    parser.add_argument('--incremental', action='store_true', help='skip faculties whose items and manual sheet are unchanged since their last build')
+    parser.add_argument('--compact', action='store_true', help='keep the export in memory in compact form, see make_report.compact_export')
+    parser.add_argument('--backend', choices=BACKENDS, default='pandas', help='process the faculties with pandas, or as lazy polars queries (needs polars)')
+    parser.add_argument('--paginate', action='store_true', help='embed the tables as compressed payloads shown in pages, for faculties with many items')
+    parser.add_argument('--profile', default=None, metavar='PATH', help='record the time, rows and memory use of every stage per faculty, write them to PATH (.json or .csv) and print a summary')
+    args = parser.parse_args()
+    failures = make_dashboards(faculties=args.faculties,
+                               periods=args.periods,
+                               precompute=not args.no_precompute,
+                               build_workers=args.build_workers,
+                               render_workers=args.render_workers,
+                               render=not args.no_render,
+                               quarto=args.quarto,
+                               single_file=args.single_file or None,
+                               incremental=args.incremental,
+                               compact=args.compact,
+                               profile=args.profile,
+                               backend=args.backend,
+                               paginate=args.paginate)
+    sys.exit(1 if failures else 0)
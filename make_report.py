@@ -1,10 +1,48 @@
 import pandas as pd
 import pickle
 from rich import print
-from typing import Any
+from rich.console import Console
+from rich.table import Table
+from typing import Any, Iterable, Iterator
+from string import Template
 from babel.numbers import format_currency
 from babel.numbers import format_compact_currency
+from babel.numbers import get_decimal_symbol, get_group_symbol
+from babel import Locale
+import numpy as np
+from pandas.api.types import union_categoricals
+import argparse
+import base64
+import gzip
+import hashlib
+import html
+import itertools
+import json
 import os
+import functools
+import inspect
+import sys
+import textwrap
+import time
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+try:
+    import polars as pl
+except ImportError:
+    # optional, only needed for CopyRightData(backend='polars')
+    pl = None
+try:
+    import resource
+except ImportError:
+    # not available on windows, the profile has no memory use there
+    resource = None
+try:
+    import psutil
+except ImportError:
+    # optional, the resident memory in the profile is read from /proc on linux and with psutil elsewhere
+    psutil = None
 
 '''
 Script to process Easy Access data from surf copyrighttool and produce a report per faculty.
@@ -12,7 +50,7 @@ by Samuel Mok, s.mok@utwente.nl
 
 Necessary data in order to run the script:
 - csv file export from the copyright tool
-- csv file with mapping of course names to faculty [READING THIS IN IS NOT IMPLEMENTED YET]
+- csv file with mapping of course codes or names to faculty
 - csv file with manually added data + how it maps to the data from the copyright tool 
 '''
 
@@ -25,11 +63,811 @@ FACULTYNAMES = ['BMS',
                 'ITC'
                 ]
 
+DEFAULT_PERIODS = ['2022', '2022-2A', '2022-2B', '2022-JAAR', '2022-SEM 2']
+
+# columns of the export that are skipped while reading it
+UNUSED_COLUMNS = ['Google search file']
+# number of rows of the export that are parsed at a time, see read_export()
+EXPORT_CHUNKSIZE = 100_000
+
+# columns of the manual sheets (manual_sheets/<faculty>.csv) that are added to the faculty data
+MANUAL_SHEET_COLUMNS = ['Manual classification', 'Status', 'Own_work', 'Free_for_use', 'Suggested action', 'Extra notes']
+# the canvas file id in the url of an item, used to match the export with the manual sheets
+CANVAS_FILE_ID = r'/files/(\d+)'
+CANVAS_FILES_URL = 'https://utwente.instructure.com/files/'
+
+# typed exports are cached here as feather files, see read_export_cache()
+CACHE_DIR = '.cache'
+CACHE_VERSION = 1
+
+# csv with the faculty of each course, compiled to MAPPING_CACHE by make_mapping()
+MAPPING_FILE = 'faculty_course_mapping.csv'
+MAPPING_CACHE = os.path.join(CACHE_DIR, 'faculty_mapping.json')
+MAPPING_VERSION = 1
+
+class CurrencyFormatter:
+    '''
+    formats amounts exactly like babel's format_currency / format_compact_currency, but for a whole column at once:
+    the currency pattern of the locale is looked up once and the amounts are formatted with vectorized string operations.
+    '''
+
+    def __init__(self, currency: str = 'EUR', locale: str = 'nl_NL'):
+        self.currency: str = currency
+        self.locale: str = locale
+        pattern = Locale.parse(locale).currency_formats['standard']
+        symbol = Locale.parse(locale).currency_symbols.get(currency, currency)
+        self.positive: tuple[str, str] = (pattern.prefix[0].replace('¤', symbol), pattern.suffix[0].replace('¤', symbol))
+        self.negative: tuple[str, str] = (pattern.prefix[1].replace('¤', symbol), pattern.suffix[1].replace('¤', symbol))
+        self.decimal: str = get_decimal_symbol(locale)
+        self.group: str = get_group_symbol(locale)
+        # only simple patterns like #,##0.00 are formatted here, anything else is left to babel
+        self.vectorized: bool = pattern.grouping == (3, 3) and pattern.frac_prec == (2, 2) and pattern.int_prec[0] == 1
+
+    def format(self, amounts: pd.Series) -> pd.Series:
+        '''
+        returns amounts formatted as currency strings, with the same index. missing amounts are left out.
+        '''
+        amounts = amounts.dropna().astype('float64')
+        if not self.vectorized or amounts.empty:
+            return amounts.apply(lambda x: format_currency(x, currency=self.currency, locale=self.locale)).astype('object')
+        values = amounts.to_numpy()
+        cents = values * 100
+        # babel rounds the decimal representation half-even; amounts close to half a cent (or too large for exact cents)
+        # can round differently in binary, so those few are formatted by babel itself
+        exact = (np.abs(cents - np.floor(cents) - 0.5) < 1e-6 + np.abs(cents) * 1e-14) | (np.abs(values) >= 1e11)
+        cents = np.abs(np.rint(np.where(exact, 0, cents))).astype('int64')
+        # amounts repeat a lot, so only the distinct (cents, sign) pairs are formatted
+        keys, inverse = np.unique(cents * 2 + np.signbit(values), return_inverse=True)
+        formatted = pd.Series(self._format_cents(keys // 2, keys % 2 == 1)[inverse], index=amounts.index, dtype='object')
+        if exact.any():
+            formatted[exact] = [format_currency(x, currency=self.currency, locale=self.locale) for x in values[exact]]
+        return formatted
+
+    def _format_cents(self, cents: np.ndarray, negative: np.ndarray) -> np.ndarray:
+        whole, fraction = cents // 100, cents % 100
+        # add the group separators from right to left: low holds the groups done so far, top the leftmost group
+        top, low, rest = whole % 1000, np.full(whole.shape, ''), whole // 1000
+        while (rest > 0).any():
+            more = rest > 0
+            low = np.where(more, np.char.add(np.char.add(self.group, np.char.zfill(top.astype('str'), 3)), low), low)
+            top = np.where(more, rest % 1000, top)
+            rest = rest // 1000
+        number = np.char.add(np.char.add(np.char.add(top.astype('str'), low), self.decimal), np.char.zfill(fraction.astype('str'), 2))
+        prefix = np.where(negative, self.negative[0], self.positive[0])
+        suffix = np.where(negative, self.negative[1], self.positive[1])
+        return np.char.add(np.char.add(prefix, number), suffix).astype('object')
+
+    def format_compact(self, amounts: pd.Series) -> pd.Series:
+        '''
+        returns amounts in the short form used in the value boxes (e.g. €\xa034K).
+        the compact patterns depend on magnitude and plural rules, so babel formats each distinct amount once.
+        '''
+        amounts = amounts.astype('float64')
+        formatted = {amount: format_compact_currency(amount, currency=self.currency, locale=self.locale) for amount in amounts.unique()}
+        return amounts.map(formatted).astype('object')
+
+EURO_FORMATTER = CurrencyFormatter(currency='EUR', locale='nl_NL')
+
+
+# dtypes applied to the export after filtering on periods
+EXPORT_DTYPES = {
+    'Material id':pd.Int64Dtype(),
+    'Period': pd.CategoricalDtype(),
+    'Department':pd.CategoricalDtype(),
+    'Course code':pd.StringDtype(),
+    'Course name':pd.StringDtype(),
+    'url':pd.StringDtype(),
+    'Filename':pd.StringDtype(),
+    'Title':pd.StringDtype(),
+    'Owner':pd.StringDtype(),
+    'Filetype':pd.CategoricalDtype(),
+    'Classification':pd.CategoricalDtype(),
+    'Type':pd.CategoricalDtype(),
+    'ML Prediction':pd.CategoricalDtype(),
+    'Manual classification':pd.CategoricalDtype(),
+    'Manual identifier':pd.StringDtype(),
+    'Scope':pd.StringDtype(),
+    'Remarks':pd.StringDtype(),
+    'Auditor':pd.StringDtype(),
+    'Last change':pd.StringDtype(),
+    'Status':pd.CategoricalDtype(),
+    'DOI':pd.StringDtype(),
+    'Author':pd.StringDtype(),
+    'Publisher':pd.StringDtype(),
+    'Pages * Students':pd.Int64Dtype(),
+}
+
+# low-cardinality text columns that are stored as categoricals in compact mode, see compact_export()
+COMPACT_CATEGORIES = ['Owner', 'Auditor', 'Publisher', 'Scope']
+
+
+class FacultyMapping:
+    '''
+    the faculty of each course, keyed on the course code or the course name (key).
+    faculties holds the faculty names, courses maps each course to an index in faculties.
+    '''
+
+    def __init__(self, key: str, faculties: list[str], courses: dict[str, int], source: dict | None = None):
+        self.key: str = key
+        self.faculties: list[str] = faculties
+        self.courses: dict[str, int] = courses
+        self.source: dict = source if source else {}
+
+    @classmethod
+    def from_dict(cls, key: str, mapping: dict[str, str]) -> 'FacultyMapping':
+        faculties = sorted(set(mapping.values()))
+        index = {faculty: i for i, faculty in enumerate(faculties)}
+        return cls(key, faculties, {course: index[faculty] for course, faculty in mapping.items()})
+
+    def to_dict(self) -> dict[str, str]:
+        return {course: self.faculties[i] for course, i in self.courses.items()}
+
+    def apply(self, data: pd.DataFrame) -> pd.Categorical:
+        '''
+        returns the faculty of each row in data as a categorical.
+        the lookup is done once per distinct course (category) and then spread over the rows via the category codes.
+        '''
+        courses = data[self.key]
+        if not isinstance(courses.dtype, pd.CategoricalDtype):
+            courses = courses.astype('category')
+        per_course = pd.Categorical(pd.Series(courses.cat.categories, dtype='object').map(self.to_dict()))
+        # code -1 (no course) picks the -1 that is appended at the end
+        codes = np.append(per_course.codes, -1)[courses.cat.codes.to_numpy()]
+        return pd.Categorical.from_codes(codes, categories=per_course.categories).remove_unused_categories()
+
+    def checksum(self) -> str:
+        return self.source.get('sha256', '')
+
+
+# faculty mappings per csv path, so the mapping is read once per process
+_faculty_mappings: dict[str, FacultyMapping] = {}
+
+def make_mapping(filepath: str = MAPPING_FILE) -> FacultyMapping:
+    '''
+    reads the csv in filepath, with a faculty column and a 'Course code' and/or 'Course name' column.
+    the course code is used as key if it's there. the result is stored as versioned json in MAPPING_CACHE.
+    '''
+    try:
+        mapping_raw = pd.read_csv(filepath, dtype='str')
+    except Exception as e:
+        print(f"error reading mapping file {filepath}")
+        raise e
+    columns = {column.lower().strip(): column for column in mapping_raw.columns}
+    key = 'Course code' if 'course code' in columns else 'Course name'
+    if key.lower() not in columns or 'faculty' not in columns:
+        raise Exception(f"mapping file {filepath} should have a 'faculty' column and a 'Course code' or 'Course name' column")
+    mapping_raw = mapping_raw[[columns[key.lower()], columns['faculty']]].dropna()
+    mapping = FacultyMapping.from_dict(key, dict(zip(mapping_raw.iloc[:, 0].str.strip(), mapping_raw.iloc[:, 1].str.strip())))
+    mapping.source = file_fingerprint(filepath)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _write_json(MAPPING_CACHE, {
+        'version': MAPPING_VERSION,
+        'source': mapping.source,
+        'key': mapping.key,
+        'faculties': mapping.faculties,
+        'courses': mapping.courses,
+    })
+    _faculty_mappings[os.path.abspath(filepath)] = mapping
+    return mapping
+
+def get_faculty_mapping(filepath: str = MAPPING_FILE) -> FacultyMapping:
+    '''
+    returns the faculty mapping, read once per process from:
+    - MAPPING_CACHE, if it was made from the current version of the csv in filepath (or if there is no csv)
+    - the csv in filepath, via make_mapping()
+    - faculties.pickle, as stored by older versions of this script
+    '''
+    path = os.path.abspath(filepath)
+    if path in _faculty_mappings:
+        return _faculty_mappings[path]
+    stored = None
+    try:
+        with open(MAPPING_CACHE, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get('version') != MAPPING_VERSION:
+            stored = None
+    except (OSError, ValueError):
+        pass
+    if os.path.exists(filepath):
+        if stored:
+            fingerprint = file_fingerprint(filepath, previous=stored['source'])
+            if fingerprint['size'] == stored['source']['size'] and fingerprint['sha256'] == stored['source']['sha256']:
+                _faculty_mappings[path] = FacultyMapping(stored['key'], stored['faculties'], stored['courses'], fingerprint)
+                return _faculty_mappings[path]
+        return make_mapping(filepath)
+    if stored:
+        _faculty_mappings[path] = FacultyMapping(stored['key'], stored['faculties'], stored['courses'], stored['source'])
+        return _faculty_mappings[path]
+    try:
+        with open('faculties.pickle', 'rb') as handle:
+            _faculty_mappings[path] = FacultyMapping.from_dict('Course name', pickle.load(handle))
+        print(f"using faculties.pickle for the faculty mapping, add {filepath} to replace it")
+        return _faculty_mappings[path]
+    except OSError:
+        print(f"no faculty mapping found, add {filepath} (see manual)")
+        raise
+
+
+# stage timings recorded while profiling is on, see enable_profiling(); None when it is off
+_profile: list[dict[str, Any]] | None = None
+PROFILE_FIELDS = ['faculty', 'stage', 'seconds', 'rows_in', 'rows_out', 'rss_growth_mb', 'stage_peak_rss_mb', 'process_max_rss_mb']
+# the peak resident memory of the @profiled calls in progress, innermost last, see _stage_memory_start()
+_stage_peaks: list[float | None] = []
+# resetting the peak for a stage also resets ru_maxrss on linux: the peak of the process seen before each reset, see _max_rss_mb()
+_process_peak_rss: float = 0.0
+
+def enable_profiling() -> None:
+    '''
+    starts recording a profile entry for every call to a @profiled function (and clears earlier entries).
+    an entry is {faculty, stage, seconds, rows_in, rows_out, rss_growth_mb, stage_peak_rss_mb, process_max_rss_mb}: the wall time of the call,
+    the rows of faculty_data before and after it (or of the returned frame), the growth of the resident memory during the call,
+    the peak resident memory during the call (linux only) and the peak resident memory of the process so far (ru_maxrss).
+    '''
+    global _profile
+    _profile = []
+
+def disable_profiling() -> None:
+    global _profile
+    _profile = None
+
+def profile_records(clear: bool = False) -> list[dict[str, Any]]:
+    '''
+    returns the recorded profile entries, and removes them from the profile if clear is True
+    '''
+    records = list(_profile) if _profile else []
+    if clear and _profile is not None:
+        _profile.clear()
+    return records
+
+def record_profile(stage: str, faculty: str, seconds: float, rows_in: int | None = None, rows_out: int | None = None, memory: bool = True,
+                   rss_growth_mb: float | None = None, stage_peak_rss_mb: float | None = None) -> None:
+    '''
+    adds an entry to the profile if profiling is on. memory=False leaves out the memory use of the process, e.g. for stages run in a subprocess
+    '''
+    if _profile is not None:
+        _profile.append({'faculty': faculty, 'stage': stage, 'seconds': seconds, 'rows_in': rows_in, 'rows_out': rows_out,
+                         'rss_growth_mb': rss_growth_mb, 'stage_peak_rss_mb': stage_peak_rss_mb,
+                         'process_max_rss_mb': _max_rss_mb() if memory else None})
+
+def add_profile_records(records: list[dict[str, Any]]) -> None:
+    '''
+    adds entries recorded elsewhere (e.g. in a worker process) to the profile
+    '''
+    if _profile is not None:
+        _profile.extend(records)
+
+def _max_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on linux, in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max(rss / 2**20 if sys.platform == 'darwin' else rss / 2**10, _process_peak_rss)
+
+def _rss_mb() -> float | None:
+    '''
+    returns the current resident memory of the process: from /proc/self/statm on linux, with psutil elsewhere (None without it)
+    '''
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    return psutil.Process().memory_info().rss / 2**20 if psutil is not None else None
+
+def _peak_rss_mb() -> float | None:
+    '''
+    returns the peak resident memory of the process since it was last reset (VmHWM), linux only
+    '''
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _reset_peak_rss() -> bool:
+    '''
+    resets the peak resident memory of the process to the current one, linux only. returns whether it was reset
+    '''
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _stage_memory_start() -> float | None:
+    '''
+    starts measuring the memory of a stage: returns the resident memory now and resets the peak, see _stage_memory_end().
+    the peak until now is kept for the stages this one is called from, as their peak includes it
+    '''
+    global _process_peak_rss
+    peak = _peak_rss_mb() or 0.0
+    _process_peak_rss = max(_process_peak_rss, peak)
+    if _stage_peaks and _stage_peaks[-1] is not None:
+        _stage_peaks[-1] = max(_stage_peaks[-1], peak)
+    _stage_peaks.append(0.0 if _reset_peak_rss() else None)
+    return _rss_mb()
+
+def _stage_memory_end(rss_before: float | None) -> tuple[float | None, float | None]:
+    '''
+    returns the growth of the resident memory since _stage_memory_start() returned rss_before, and the peak in between
+    '''
+    global _process_peak_rss
+    peak = _stage_peaks.pop()
+    if peak is not None:
+        peak = max(peak, _peak_rss_mb() or 0.0)
+        _process_peak_rss = max(_process_peak_rss, peak)
+        if _stage_peaks and _stage_peaks[-1] is not None:
+            _stage_peaks[-1] = max(_stage_peaks[-1], peak)
+    rss = _rss_mb()
+    return (rss - rss_before if rss is not None and rss_before is not None else None), peak
+
+def _rows(data: Any) -> int | None:
+    return len(data) if isinstance(data, pd.DataFrame) else None
+
+def profiled(func):
+    '''
+    decorator: records the call as a stage named after func while profiling is on, and does nothing else when it is off.
+    the faculty is taken from the CopyRightData instance for methods, or from the faculty argument for functions.
+    '''
+    takes_faculty = next(iter(inspect.signature(func).parameters), None) == 'faculty'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _profile is None:
+            return func(*args, **kwargs)
+        owner = args[0] if args and isinstance(args[0], CopyRightData) else None
+        if owner is not None:
+            faculty = owner.faculty
+        else:
+            faculty = kwargs.get('faculty', args[0] if args and takes_faculty else '')
+        rows_in = _rows(owner._items()) if owner is not None else None
+        rss_before = _stage_memory_start()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            rss_growth, stage_peak = _stage_memory_end(rss_before)
+        rows_out = _rows(result) if _rows(result) is not None or owner is None else _rows(owner._items())
+        record_profile(func.__name__, faculty, seconds, rows_in, rows_out, rss_growth_mb=rss_growth, stage_peak_rss_mb=stage_peak)
+        return result
+    return wrapper
+
+def profile_summary(records: list[dict[str, Any]] | None = None) -> pd.DataFrame:
+    '''
+    returns the profile per faculty and stage: number of calls, total seconds, rows in of the first call, rows out of the last call,
+    total growth and peak of the resident memory of the stage, and the peak of the process (ru_maxrss)
+    '''
+    trace = _profile_frame(profile_records() if records is None else records)
+    return trace.groupby(['faculty', 'stage'], sort=False).agg(
+        calls=('seconds', 'size'),
+        seconds=('seconds', 'sum'),
+        rows_in=('rows_in', 'first'),
+        rows_out=('rows_out', 'last'),
+        rss_growth_mb=('rss_growth_mb', lambda growth: growth.sum(min_count=1)),
+        stage_peak_rss_mb=('stage_peak_rss_mb', 'max'),
+        process_max_rss_mb=('process_max_rss_mb', 'max'),
+    ).reset_index()
+
+def write_profile(filepath: str, records: list[dict[str, Any]] | None = None) -> None:
+    '''
+    writes the profile entries to filepath: a json list if it ends with .json, csv otherwise
+    '''
+    records = profile_records() if records is None else records
+    if filepath.endswith('.json'):
+        _write_json(filepath, records)
+    else:
+        _profile_frame(records).to_csv(filepath, index=False)
+
+def _profile_frame(records: list[dict[str, Any]]) -> pd.DataFrame:
+    return pd.DataFrame(records, columns=PROFILE_FIELDS).astype({'rows_in': 'Int64', 'rows_out': 'Int64', 'rss_growth_mb': 'Float64',
+                                                                 'stage_peak_rss_mb': 'Float64', 'process_max_rss_mb': 'Float64'})
+
+def print_profile(records: list[dict[str, Any]] | None = None) -> None:
+    table = Table(title='Profile per faculty and stage')
+    summary = profile_summary(records)
+    for column in summary.columns:
+        table.add_column(column, justify='left' if column in ['faculty', 'stage'] else 'right')
+    for row in summary.itertuples(index=False):
+        table.add_row(row.faculty or '-', row.stage, str(row.calls), f'{row.seconds:.3f}',
+                      *['-' if pd.isna(value) else f'{value:.0f}' for value in [row.rows_in, row.rows_out, row.rss_growth_mb, row.stage_peak_rss_mb,
+                                                                                   row.process_max_rss_mb]])
+    Console().print(table)
+
+
+class LoadedExport:
+    '''
+    the copyright tool export for a set of periods: parsed, cast and grouped by faculty once.
+    shared by all CopyRightData instances in this process, see load_export()
+    '''
+
+    def __init__(self, data: pd.DataFrame, compact: bool = False):
+        if compact:
+            # sorted on faculty, so the rows of each faculty are a slice of data instead of a copy
+            data = data.sort_values('faculty', kind='stable')
+        self.data: pd.DataFrame = data
+        self.compact = compact
+        self.grouped = data.groupby(by=['faculty'], observed=False)
+
+    @functools.cached_property
+    def faculties(self) -> dict[str, pd.DataFrame]:
+        '''
+        the rows of each faculty, split off on first use: {faculty: rows}
+        '''
+        data = self.data
+        if self.compact:
+            codes = data['faculty'].cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(data['faculty'].cat.categories))
+            stops = np.cumsum(counts)
+            return {name: data.iloc[stop - count:stop] for name, count, stop in zip(data['faculty'].cat.categories, counts, stops)}
+        return {name[0]: details for name, details in self.grouped}
+
+    def get_faculty(self, faculty: str) -> pd.DataFrame:
+        '''
+        returns a copy of the rows for faculty, so callers can add columns without touching the shared data.
+        in compact mode this is a shallow copy: the values are shared with the loaded export.
+        '''
+        if self.compact:
+            return self.faculties[faculty].copy(deep=False)
+        return self.faculties[faculty].copy()
+
+
+def compact_export(data: pd.DataFrame) -> pd.DataFrame:
+    '''
+    returns data with the same values in less memory:
+    - COMPACT_CATEGORIES as categoricals
+    - the other text columns of the export as arrow-backed strings (if pyarrow is installed)
+    - integer columns downcast to the smallest integer type that holds their values
+    '''
+    dtypes = {}
+    for column in data.columns:
+        dtype = data[column].dtype
+        if column in COMPACT_CATEGORIES:
+            dtypes[column] = pd.CategoricalDtype()
+        elif isinstance(EXPORT_DTYPES.get(column), pd.StringDtype) and feather is not None:
+            dtypes[column] = pd.StringDtype('pyarrow')
+        elif pd.api.types.is_integer_dtype(dtype) and data[column].notna().any():
+            low, high = data[column].min(), data[column].max()
+            for bits in [8, 16, 32]:
+                if np.iinfo(f'int{bits}').min <= low and high <= np.iinfo(f'int{bits}').max:
+                    dtypes[column] = f'Int{bits}' if isinstance(dtype, pd.api.extensions.ExtensionDtype) else f'int{bits}'
+                    break
+    return data.astype(dtypes)
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    '''
+    returns the dtype and bytes per column of before and after (e.g. the export before and after compact_export()),
+    with the totals in the last row
+    '''
+    report = pd.DataFrame({
+        'dtype before': before.dtypes.astype('str'),
+        'bytes before': before.memory_usage(index=False, deep=True),
+        'dtype after': after.dtypes.astype('str'),
+        'bytes after': after.memory_usage(index=False, deep=True),
+    })
+    report.loc['total'] = ['', report['bytes before'].sum(), '', report['bytes after'].sum()]
+    return report
+
+def print_memory_report(report: pd.DataFrame) -> None:
+    table = Table(title='Memory use per column')
+    for column in ['column', *report.columns]:
+        table.add_column(column, justify='right' if column.startswith('bytes') else 'left')
+    for column, row in report.iterrows():
+        table.add_row(str(column), row['dtype before'], f"{row['bytes before']:,.0f}", row['dtype after'], f"{row['bytes after']:,.0f}")
+    Console().print(table)
+
+
+def file_fingerprint(filepath: str, previous: dict | None = None) -> dict:
+    '''
+    returns the size, mtime and sha256 of the file in filepath.
+    if size and mtime are unchanged compared to previous, the hash from previous is reused instead of reading the file again.
+    '''
+    stat = os.stat(filepath)
+    fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    if previous and previous.get('size') == fingerprint['size'] and previous.get('mtime') == fingerprint['mtime']:
+        fingerprint['sha256'] = previous['sha256']
+        return fingerprint
+    sha256 = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    fingerprint['sha256'] = sha256.hexdigest()
+    return fingerprint
+
+def _export_cache_paths(filepath: str, periods: list[str]) -> tuple[str, str]:
+    '''
+    returns the paths of the feather file and its metadata for the export in filepath + periods
+    '''
+    key = hashlib.sha256('\n'.join([os.path.abspath(filepath), *periods]).encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(CACHE_DIR, f'export_{key}')
+    return f'{base}.feather', f'{base}.json'
+
+@profiled
+def read_export(filepath: str, periods: list[str], chunksize: int = EXPORT_CHUNKSIZE) -> pd.DataFrame:
+    '''
+    parses the export in filepath, keeps the rows for periods and casts it to EXPORT_DTYPES + adds the expected fine.
+    the csv is read in chunks of chunksize rows: other periods and UNUSED_COLUMNS are dropped per chunk,
+    so memory use depends on the rows that are kept and not on the size of the export.
+    the columns that aren't in EXPORT_DTYPES are read as text and typed once all chunks are read, see _infer_text_column().
+    '''
+    chunks = []
+    try:
+        # types guessed per chunk can differ between chunks (e.g. an ISBN column mixing numbers and text, or a categorical column
+        # without any value in one chunk), which breaks the cache and the union of the categories below
+        other = [column for column in pd.read_csv(filepath, nrows=0).columns if column not in EXPORT_DTYPES and column not in UNUSED_COLUMNS]
+        text = [column for column, dtype in EXPORT_DTYPES.items() if isinstance(dtype, pd.CategoricalDtype)] + other
+        reader = pd.read_csv(filepath, chunksize=chunksize, dtype={column: 'str' for column in text}, usecols=lambda column: column not in UNUSED_COLUMNS)
+        for chunk in reader:
+            chunk = chunk[chunk['Period'].isin(periods)]
+            if chunk.empty and chunks:
+                continue
+            chunks.append(chunk.astype(EXPORT_DTYPES))
+    except Exception as e:
+        print(f"error reading data file {filepath}. Please check that the file exists and is in the correct format: \n     - {filepath} \n    - containing the necessary columns (see manual)")
+        raise e
+    # every chunk has its own categories: give them all the (sorted) union so concat keeps the columns categorical
+    for column, dtype in EXPORT_DTYPES.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = union_categoricals([chunk[column] for chunk in chunks], sort_categories=True).categories
+            chunks = [chunk.assign(**{column: chunk[column].cat.set_categories(categories)}) for chunk in chunks]
+    copyright_data_raw = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+    copyright_data_raw = copyright_data_raw.assign(**{column: _infer_text_column(copyright_data_raw[column]) for column in other})
+    copyright_data_raw['Expected fine'] = copyright_data_raw[copyright_data_raw['Classification'] == 'lange overname']['Pages * Students'].mul(0.3)
+    return copyright_data_raw
+
+def _infer_text_column(values: pd.Series) -> pd.Series:
+    '''
+    returns the text in values as booleans or numbers if all of it is, like read_csv infers the type of a whole column, and as text otherwise
+    '''
+    present = values.dropna()
+    if len(present) and present.isin(['True', 'False']).all():
+        booleans = values.map({'True': True, 'False': False})
+        return booleans.astype('bool') if len(present) == len(values) else booleans
+    try:
+        return pd.to_numeric(values)
+    except (ValueError, TypeError):
+        return values
+
+@profiled
+def read_export_cache(filepath: str, periods: list[str]) -> pd.DataFrame | None:
+    '''
+    returns the cached typed export for filepath + periods, memory-mapped from the feather file.
+    returns None if there is no cache, or if the size or content hash of the export changed since it was written.
+    '''
+    if feather is None:
+        return None
+    cache_path = export_cache_path(filepath, periods)
+    if cache_path is None:
+        return None
+    try:
+        return feather.read_feather(cache_path, memory_map=True)
+    except Exception as e:
+        print(f"could not read cached export {cache_path}, rebuilding: {e}")
+        return None
+
+def export_cache_path(filepath: str, periods: list[str]) -> str | None:
+    '''
+    returns the path of the feather cache for filepath + periods if it is up to date,
+    None if there is no cache or if the size or content hash of the export changed since it was written.
+    '''
+    cache_path, meta_path = _export_cache_paths(filepath, periods)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION or meta.get('periods') != list(periods):
+        return None
+    fingerprint = file_fingerprint(filepath, previous=meta['source'])
+    if fingerprint['size'] != meta['source']['size'] or fingerprint['sha256'] != meta['source']['sha256'] or not os.path.exists(cache_path):
+        return None
+    if fingerprint['mtime'] != meta['source']['mtime']:
+        # same content with a new mtime (e.g. copied again): store it so the hash is skipped next time
+        meta['source'] = fingerprint
+        _write_json(meta_path, meta)
+    return cache_path
+
+def write_export_cache(filepath: str, periods: list[str], data: pd.DataFrame, fingerprint: dict | None = None) -> None:
+    '''
+    stores the typed export as an uncompressed feather file so later runs can memory-map it
+    '''
+    if feather is None:
+        print("pyarrow is not installed, not caching the export")
+        return None
+    cache_path, meta_path = _export_cache_paths(filepath, periods)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fingerprint = fingerprint if fingerprint else file_fingerprint(filepath)
+    try:
+        feather.write_feather(data, f'{cache_path}.tmp', compression='uncompressed')
+    except Exception as e:
+        print(f"could not cache export {filepath}: {e}")
+        return None
+    os.replace(f'{cache_path}.tmp', cache_path)
+    _write_json(meta_path, {'version': CACHE_VERSION, 'periods': list(periods), 'source': fingerprint})
+
+def rebuild_export_cache(filepath: str = 'copyright_export.csv', periods: list[str] | None = None) -> pd.DataFrame:
+    '''
+    parses the export again and overwrites the cache, regardless of its fingerprint
+    '''
+    periods = periods if periods else DEFAULT_PERIODS
+    fingerprint = file_fingerprint(filepath)
+    data = read_export(filepath, periods)
+    write_export_cache(filepath, periods, data, fingerprint)
+    for key in [key for key in _loaded_exports if key[:2] == (os.path.abspath(filepath), tuple(periods))]:
+        del _loaded_exports[key]
+    return data
+
+def _write_json(filepath: str, content: dict) -> None:
+    with open(f'{filepath}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(content, f, indent=2)
+    os.replace(f'{filepath}.tmp', filepath)
+
+
+# loaded exports per (filepath, periods, mapping checksum, compact), so the csv is parsed once per process
+_loaded_exports: dict[tuple[str, tuple[str, ...], str, bool], LoadedExport] = {}
+
+def load_export(filepath: str, periods: list[str], mapping: FacultyMapping, use_cache: bool = True, compact: bool = False) -> LoadedExport:
+    '''
+    returns the typed export for periods with the faculty of each item added.
+    the typed rows come from the feather cache when it is up to date (see read_export_cache), otherwise the csv is parsed and the cache is refreshed.
+    the result is kept per process: later calls with the same filepath and periods return the same LoadedExport.
+    if compact is True, the columns are stored in less memory (see compact_export) and the faculties share their rows with the export.
+    '''
+    key = (os.path.abspath(filepath), tuple(periods), mapping.checksum(), compact)
+    if key in _loaded_exports:
+        return _loaded_exports[key]
+    data = read_export_cache(filepath, periods) if use_cache else None
+    if data is None:
+        fingerprint = file_fingerprint(filepath) if use_cache else None
+        data = read_export(filepath, periods)
+        if use_cache:
+            write_export_cache(filepath, periods, data, fingerprint)
+    data.insert(data.columns.get_loc('Expected fine'), 'faculty', mapping.apply(data))
+    if compact:
+        data = compact_export(data)
+    _loaded_exports[key] = LoadedExport(data, compact=compact)
+    return _loaded_exports[key]
+
+
+# 'polars' runs the steps of CopyRightData.get_data() as one lazy query, see query_faculty()
+BACKENDS = ['pandas', 'polars']
+
+# exclusion rules of CopyRightData.get_masks(): (column, values that exclude an item from the long excerpts)
+LONG_EXCERPT_EXCLUSIONS = [
+    ('Own_work', ['Yes', 'yes']),
+    ('Free_for_use', ['Yes', 'yes']),
+    ('Status_recent', ['Deleted', 'deleted']),
+    ('ML Prediction', ['eigen materiaal - powerpoint']),
+]
+MANUAL_EXCLUSIONS = ['eigen materiaal - powerpoint', 'open access', 'eigen materiaal - overig']
+
+
+def scan_export(filepath: str, periods: list[str]) -> 'pl.LazyFrame':
+    '''
+    returns a lazy polars query over the rows of the export for periods, with their row label in the export as __index:
+    the feather cache if it is up to date (see export_cache_path), otherwise the csv with the expected fine added.
+    the csv columns that aren't Int64 in EXPORT_DTYPES are read as text, see _text_kinds() for the types of the columns not in EXPORT_DTYPES
+    '''
+    cache_path = export_cache_path(filepath, periods) if feather is not None else None
+    if cache_path:
+        # read through pyarrow: pl.scan_ipc fails on the dictionary keys pandas writes for missing categoricals
+        export = pl.from_arrow(feather.read_table(cache_path, memory_map=True)).lazy()
+        if '__index_level_0__' in export.collect_schema().names():
+            return export.rename({'__index_level_0__': '__index'})
+        return export.with_row_index('__index')
+    # types guessed from the first rows fail on the rows further down that don't fit them
+    export = pl.scan_csv(filepath, infer_schema=False)
+    names = export.collect_schema().names()
+    export = export.with_columns(pl.col(column).cast(pl.Int64) for column, dtype in EXPORT_DTYPES.items() if isinstance(dtype, pd.Int64Dtype) and column in names)
+    export = export.with_row_index('__index')
+    export = export.drop(UNUSED_COLUMNS, strict=False).filter(pl.col('Period').is_in(periods))
+    return export.with_columns(pl.when(pl.col('Classification') == 'lange overname').then(pl.col('Pages * Students') * 0.3).alias('Expected fine'))
+
+def _text_kinds(columns: list[str]) -> list['pl.Expr']:
+    '''
+    returns polars aggregates with the pandas dtype of each of the text columns, as _infer_text_column() would set it on the whole export:
+    'bool' or 'object' for True/False (the latter with missing values), 'int64' or 'float64' for numbers, 'str' otherwise
+    '''
+    kinds = []
+    for column in columns:
+        present = pl.col(column).drop_nulls()
+        missing = pl.col(column).null_count() > 0
+        kinds.append(pl.when(present.len() == 0).then(pl.lit('float64'))
+                     .when(present.is_in(['True', 'False']).all()).then(pl.when(missing).then(pl.lit('object')).otherwise(pl.lit('bool')))
+                     .when(present.str.to_integer(strict=False).is_not_null().all()).then(pl.when(missing).then(pl.lit('float64')).otherwise(pl.lit('int64')))
+                     .when(present.cast(pl.Float64, strict=False).is_not_null().all()).then(pl.lit('float64'))
+                     .otherwise(pl.lit('str')).alias(column))
+    return kinds
+
+def query_faculty(filepath: str, periods: list[str], mapping: FacultyMapping, faculty: str, manual: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, dict[str, dict[str, Any]]]:
+    '''
+    the polars backend of CopyRightData: runs the period filter, faculty mapping, manual sheet join, exclusion filters
+    and department aggregates for faculty as one lazy query, optimized and executed by polars on all cores.
+    returns the same faculty_data, masks and department_stats as the pandas backend, as pandas.
+    '''
+    if pl is None:
+        raise Exception('polars is not installed, use the pandas backend or pip install polars')
+    export = scan_export(filepath, periods)
+    courses = pl.LazyFrame({mapping.key: list(mapping.courses), 'faculty': [mapping.faculties[code] for code in mapping.courses.values()]},
+                           schema={mapping.key: pl.String, 'faculty': pl.String})
+    export = export.with_columns(pl.col(mapping.key).cast(pl.String)).join(courses, on=mapping.key, how='left', maintain_order='left')
+    names = [name for name in export.collect_schema().names() if name != 'faculty']
+    # the rows and the categories below are selected from the same scan, not from one scan each
+    export = export.select([*names[:names.index('Expected fine')], 'faculty', *names[names.index('Expected fine'):]]).cache()
+
+    # the categories of the pandas backend are those of the whole export, not only of this faculty
+    categorical = [column for column, dtype in EXPORT_DTYPES.items() if isinstance(dtype, pd.CategoricalDtype) and column in names]
+    categories = export.select([pl.col(column).cast(pl.String).drop_nulls().unique().implode() for column in [*categorical, 'faculty']])
+    # so are the types of the columns read as text that aren't in EXPORT_DTYPES
+    schema = export.collect_schema()
+    text = [name for name in names if name not in EXPORT_DTYPES and schema[name] == pl.String]
+    kinds = export.select(_text_kinds(text)) if text else pl.LazyFrame()
+
+    rows = export.filter(pl.col('faculty') == faculty)
+    if 'Status' in manual.columns:
+        rows = rows.rename({'Status': 'Status_recent'})
+    if 'Manual classification' in manual.columns:
+        rows = rows.drop('Manual classification')
+    sheet = pl.from_pandas(_mixed_as_text(manual.reset_index().rename(columns={'url_id_x': '__file_id'}))).lazy()
+    rows = rows.with_columns(pl.col('url').str.extract(CANVAS_FILE_ID, 1).cast(pl.Int64, strict=False).alias('__file_id'))
+    rows = rows.join(sheet.with_columns(pl.col('__file_id').cast(pl.Int64)), on='__file_id', how='left', maintain_order='left').drop('__file_id')
+
+    columns = rows.collect_schema().names()
+    long_excerpt = (pl.col('Classification').cast(pl.String) == 'lange overname').fill_null(False)
+    for column, values in LONG_EXCERPT_EXCLUSIONS:
+        if column in columns:
+            long_excerpt &= ~pl.col(column).cast(pl.String).is_in(values).fill_null(False)
+    excluded = pl.col('Manual classification').cast(pl.String).is_in(MANUAL_EXCLUSIONS).fill_null(False) if 'Manual classification' in columns else pl.lit(False)
+    rows = rows.with_columns(long_excerpt.alias('__long excerpt'), excluded.alias('__excluded'))
+    # categoricals are passed on as text, the pandas categories are set below
+    rows = rows.with_columns((pl.col('__long excerpt') & ~pl.col('__excluded')).alias('__needs action'), pl.col(pl.Categorical).cast(pl.String))
+    departments = rows.filter(pl.col('Department').is_not_null())
+    counts = departments.group_by('Department', 'Classification').agg(pl.len().alias('count'))
+    departments = departments.group_by('Department').agg(
+        pl.col('Expected fine').sum().alias('total_costs'),
+        pl.col('__needs action').sum().alias('lange overname manual'),
+        pl.col('Expected fine').filter(pl.col('__needs action')).sum().alias('total_costs_manual'),
+        pl.len().alias('total_items'),
+    )
+    rows, counts, departments, categories, kinds = pl.collect_all([rows.cache(), counts, departments, categories, kinds])
+
+    data = rows.to_pandas().set_index('__index')
+    data.index = data.index.astype('int64').rename(None)
+    masks = data[['__long excerpt', '__excluded', '__needs action']].rename(columns=lambda column: column[2:]).astype('bool')
+    data = data.drop(columns=masks.columns.map(lambda column: f'__{column}'))
+    dtypes = {column: dtype for column, dtype in EXPORT_DTYPES.items() if column in data.columns and not isinstance(dtype, pd.CategoricalDtype)}
+    for column in categorical:
+        target = 'Status_recent' if column == 'Status' and column in manual.columns else column
+        if target in data.columns and not (column == 'Manual classification' and column in manual.columns):
+            dtypes[target] = pd.CategoricalDtype(sorted(categories[column][0].to_list()))
+    present = set(categories['faculty'][0].to_list())
+    dtypes['faculty'] = pd.CategoricalDtype([name for name in mapping.faculties if name in present])
+    dtypes['Expected fine'] = pd.Float64Dtype()
+    for column in kinds.columns:
+        kind = kinds[column][0]
+        if column in data.columns and kind in ('bool', 'object'):
+            data[column] = data[column].map({'True': True, 'False': False}).astype(kind)
+        elif column in data.columns:
+            dtypes[column] = kind
+    data = _finish_manual_join(data.astype(dtypes))
+    counts = counts.to_pandas().pivot_table(index='Department', columns='Classification', values='count', aggfunc='sum')
+    counts = counts.reindex(columns=dtypes['Classification'].categories, fill_value=0).fillna(0).astype('int64')
+    department_stats = {}
+    for row in departments.to_dicts():
+        department = row.pop('Department')
+        department_stats[department] = {**(counts.loc[department].to_dict() if department in counts.index else {}), **row}
+    return data, masks, department_stats
+
+
 class CopyRightData:
 
-    def __init__(self, periods: list[str] = None, faculty: str = ''):
+    def __init__(self, periods: list[str] = None, faculty: str = '', compact: bool = False, backend: str = 'pandas'):
     
-        self.mapping: dict = {}
+        self.mapping: FacultyMapping | None = None
         self.mapping = self.get_mapping()
         self.data: pd.DataFrame = pd.DataFrame()
         self.data_grouped: list[tuple[str, pd.DataFrame]]  = []
@@ -39,6 +877,14 @@ class CopyRightData:
         self.stats: dict[str, Any] = {}
         self.all_long_excerpts: pd.DataFrame = pd.DataFrame()
         self.all_long_excerpts_grouped: list[tuple[str, pd.DataFrame]] = []
+        self.department_stats: dict[str, dict[str, Any]] = {}
+        self.masks: pd.DataFrame = pd.DataFrame()
+        self.sheet_errors: dict[str, str] = {}
+        self.sheet_columns: dict[str, list[str]] = {}
+        self.export_dtypes: dict[str, Any] = {}
+        self.faculty_rows: dict[str, np.ndarray] = {}
+        self.compact: bool = compact
+        self.backend: str = backend
 
     def set_periods(self, periods: list[str]):
         self.periods = periods
@@ -49,88 +895,71 @@ class CopyRightData:
     def get_faculty(self) -> str:
         return self.faculty
 
-    def get_mapping(self) -> dict:
+    def get_mapping(self) -> FacultyMapping:
         '''
-        Reads in mapping data from:
-        - pickle if no file is provided
-        - from parameter csv
+        returns the faculty mapping, see get_faculty_mapping()
         '''
         if not self.mapping:
-            try:
-                with open('faculties.pickle', 'rb') as handle:
-                    self.mapping = pickle.load(handle)
-            except Exception as e:
-                print("no stored mappings found, run make_mapping() first. Trying now with default filename.")
-                self.make_mapping()
-                return self.mapping
+            self.mapping = get_faculty_mapping()
         return self.mapping
 
-    def make_mapping(self, filepath: str='faculty_course_mapping.csv') -> dict:
+    def make_mapping(self, filepath: str=MAPPING_FILE) -> FacultyMapping:
         '''
         makes mappings from csv file in filepath
-        stores as pickle file + returns mapping
+        stores as json file + returns mapping
         '''
-        try:
-            with open(filepath, 'r') as f:
-                mapping_raw = pd.read_csv(f)
-        except Exception as e:
-            print(f"error reading mapping file {filepath}")
-            raise e
-        
-        # process data and store in self.mapping + pickle
-        ...
+        self.mapping = make_mapping(filepath)
         return self.mapping
 
+    @profiled
     def get_data(self, filepath: str = 'copyright_export.csv') -> pd.DataFrame:
-        try:
-            self.data = pd.read_csv(filepath)
-        except Exception as e:
-            print(f"error reading data file {filepath}. Please check that the file exists and is in the correct format: \n     - {filepath} \n    - containing the necessary columns (see manual)")
-            raise e
-        copyright_data_raw = self.data[self.data['Period'].isin(self.periods)]
-        copyright_data_raw = copyright_data_raw.assign(faculty='')
-        if 'Google search file' in copyright_data_raw:
-            copyright_data_raw.drop('Google search file', axis=1, inplace=True)
-        copyright_data_raw = copyright_data_raw.astype({
-                                                        'Material id':pd.Int64Dtype(),
-                                                        'Period': pd.CategoricalDtype(),
-                                                        'Department':pd.CategoricalDtype(),
-                                                        'Course code':pd.StringDtype(),
-                                                        'Course name':pd.StringDtype(),
-                                                        'url':pd.StringDtype(),
-                                                        'Filename':pd.StringDtype(),
-                                                        'Title':pd.StringDtype(),
-                                                        'Owner':pd.StringDtype(),
-                                                        'Filetype':pd.CategoricalDtype(),
-                                                        'Classification':pd.CategoricalDtype(),
-                                                        'Type':pd.CategoricalDtype(),
-                                                        'ML Prediction':pd.CategoricalDtype(),
-                                                        'Manual classification':pd.CategoricalDtype(),
-                                                        'Manual identifier':pd.StringDtype(),
-                                                        'Scope':pd.StringDtype(),
-                                                        'Remarks':pd.StringDtype(),
-                                                        'Auditor':pd.StringDtype(),
-                                                        'Last change':pd.StringDtype(),
-                                                        'Status':pd.CategoricalDtype(),
-                                                        'DOI':pd.StringDtype(),
-                                                        'Author':pd.StringDtype(),
-                                                        'Publisher':pd.StringDtype(),
-                                                        'Pages * Students':pd.Int64Dtype(),
-                                                        })
-        self.get_mapping()
-        copyright_data_raw = copyright_data_raw.assign(faculty=lambda x: x['Course name'].map(self.mapping))
-        copyright_data_raw['faculty'] = copyright_data_raw['faculty'].astype('category')
-        copyright_data_raw['Expected fine'] = copyright_data_raw[copyright_data_raw['Classification'] == 'lange overname']['Pages * Students'].mul(0.3)
-        self.data_grouped = copyright_data_raw.groupby(by=['faculty'], observed=False)
-        if self.faculty in FACULTYNAMES:
-            for name, details in self.data_grouped:
-                if name[0] == self.faculty:
-                    self.faculty_data = details
-                    self.add_student_sheet_data()
+        if self.backend == 'polars' and self.faculty in FACULTYNAMES:
+            return self._get_data_lazy(filepath)
+        export = load_export(filepath, self.periods, self.get_mapping(), compact=self.compact)
+        self.data = export.data
+        self.department_stats = {}
+        self.masks = pd.DataFrame()
+        self.faculty_rows = {}
+        self.data_grouped = export.grouped
+        if self.faculty in FACULTYNAMES and self.faculty in export.faculties:
+            self.faculty_data = export.get_faculty(self.faculty)
+            if self.compact:
+                # only the rows of the faculty are used from here on, don't keep the whole export alive
+                self.data, self.data_grouped = pd.DataFrame(), []
+            self.add_student_sheet_data()
+        elif not self.faculty:
+            self.add_all_student_sheet_data()
 
         self.calculate_stats()
         return self.format_costs()
 
+    def _get_data_lazy(self, filepath: str) -> pd.DataFrame:
+        '''
+        get_data() with the polars backend: the export is never loaded as a whole, see query_faculty()
+        '''
+        self.data, self.data_grouped = pd.DataFrame(), []
+        self.stats = {}
+        self.faculty_data, self.masks, self.department_stats = query_faculty(filepath, self.periods, self.get_mapping(), self.faculty, self.read_manual_sheet())
+        if self.faculty_data.empty:
+            self.masks, self.department_stats = pd.DataFrame(), {}
+        self.calculate_stats()
+        return self.format_costs()
+
+    def read_manual_sheet(self, faculty: str | None = None) -> pd.DataFrame:
+        '''
+        reads manual_sheets/<faculty>.csv (default: self.faculty), indexed on the canvas file id in url_id_x
+        '''
+        faculty = faculty if faculty else self.faculty
+        file_path = os.path.join('manual_sheets', f'{faculty}.csv')
+        try:
+            df = pd.read_csv(file_path, encoding='utf-8', usecols=lambda column: column in MANUAL_SHEET_COLUMNS or column == 'url_id_x')
+        except Exception as e:
+            print(f"error reading student data file {file_path}. Please check that the file exists and is in the correct format: \n     - manual_sheets/{faculty}.csv \n    - containing the necessary columns (see manual)")
+            raise e
+        # match on the numeric canvas file id, e.g. 12345 in https://utwente.instructure.com/files/12345?
+        return df.assign(url_id_x=pd.to_numeric(df['url_id_x'], errors='coerce').astype('Int64')).dropna(subset=['url_id_x']).set_index('url_id_x')
+
+    @profiled
     def add_student_sheet_data(self) -> None:
         '''
         load in manual data sheet for the faculty and add to faculty_data
@@ -143,93 +972,121 @@ class CopyRightData:
             if self.faculty_data.empty:
                 raise Exception(f'No copyright tool data found for {self.faculty} -- cannot add manual sheet data.')
 
-        file_path = os.path.join('manual_sheets', f'{self.faculty}.csv')
-        try:
-            df = pd.read_csv(file_path, encoding='utf-8')
-        except Exception as e:
-            print(f"error reading student data file {file_path}. Please check that the file exists and is in the correct format: \n     - manual_sheets/{self.faculty}.csv \n    - containing the necessary columns (see manual)")
-            raise e
-        df['url_id_x'] = df['url_id_x'].astype('str')
-        prefix_to_remove = 'https://utwente.instructure.com/files/'
-        self.faculty_data['id_cc'] = self.faculty_data['url'].str.replace(prefix_to_remove, '', regex=False).str.replace('?', '', regex=False)
-        self.faculty_data.sort_values(by=['id_cc'], inplace=True)
-        self.faculty_data = pd.merge(self.faculty_data, df.sort_values(by=['url_id_x']),  how="left", left_on="id_cc", right_on="url_id_x").dropna(axis='columns',how='all')
-        column_names = {
-            'Classification_x': 'Classification',
-            'Manual classification_y': 'Manual classification',
-            'Owner_x': 'Owner',
-            'Course code_x': 'Course code',
-            'Period_x': 'Period',
-            'Type_x': 'Type',
-            'Manual identifier_x': 'Manual identifier',
-            'Scope_x': 'Scope',
-            'Remarks_x': 'Remarks',
-            'Auditor_x': 'Auditor',
-            'Last change_x': 'Last change',
-            'ISBN_x': 'ISBN',
-            'DOI_x': 'DOI',
-            'In collection_x': 'In collection',
-            'pagecount_x': 'pagecount',
-            'wordcount_x': 'wordcount',
-            'picturecount_x': 'picturecount',
-            'Reliability_x': 'Reliability',
-            'Pages * Students_x': 'Pages * Students',
-            '#students_registered_x': '#students registered',
-            'Status_y': 'Status',
-            'Filetype_x':'Filetype',
-            'Status_x': 'Status_recent',
-            }
-        self.faculty_data.rename(columns=column_names, inplace=True)
-        droplist = [
-            'id_cc',
-            'Unnamed: 0',
-            'Classification_y',
-            'Reliability_y',
-            'Period_y',
-            'Course code_y',
-            'url_id_x',
-            'id_y',
-            'Title_x',
-            'Owner_y',
-            'Filetype_y',
-            'Type_y',
-            'Scope_y',
-            'Remarks_y',
-            'Auditor_y',
-            'Last change_y',
-            'updated_at',
-            'Status2',
-            'ISBN_y',
-            'DOI_y',
-            'In collection_y',
-            'pagecount_y',
-            'wordcount_y',
-            'picturecount_y',
-            'Pages * Students_y',
-            '#students_registered_y',
-            'Publisher_x',
-            'Manual identifier_y',
-            'Manual classification_x',
-
-        ]
-        try:
-            self.faculty_data.drop(droplist, axis=1, inplace=True)
-        except Exception as e:
-            #print('cannot drop columns for faculty', self.faculty)
-            ...
-        try:
-            self.faculty_data.drop('Classification ->', axis=1, inplace=True)
-        except Exception as e:
-            ...
-        if 'Manual classification' not in self.faculty_data.columns:
-            if 'Manual classification_y' in self.faculty_data.columns:
-                self.faculty_data['Manual classification'] = self.faculty_data['Manual classification_y']
-                self.faculty_data.drop('Manual classification_y', axis=1, inplace=True)
-            elif 'Manual classification_x' in self.faculty_data.columns:
-                self.faculty_data['Manual classification'] = self.faculty_data['Manual classification_x']
-                self.faculty_data.drop('Manual classification_x', axis=1, inplace=True)
-            else:
-                self.faculty_data['Manual classification'] = '-'
+        manual = self.read_manual_sheet()
+        file_id = pd.to_numeric(self.faculty_data['url'].str.extract(CANVAS_FILE_ID, expand=False), errors='coerce').astype('Int64')
+        # the status and the manual classification in the sheet replace the ones from the export, if the sheet has them.
+        # the status from the export is kept as Status_recent
+        faculty_data = self.faculty_data
+        if 'Status' in manual.columns:
+            faculty_data = faculty_data.rename(columns={'Status': 'Status_recent'})
+        if 'Manual classification' in manual.columns:
+            faculty_data = faculty_data.drop(columns='Manual classification')
+        self.faculty_data = _finish_manual_join(faculty_data.assign(file_id=file_id).join(manual, on='file_id').drop(columns='file_id'))
+        self.masks = pd.DataFrame()
+        self.department_stats = {}
+
+    @profiled
+    def add_all_student_sheet_data(self) -> None:
+        '''
+        institution-wide version of add_student_sheet_data(): the manual sheets of all faculties in FACULTYNAMES are concatenated
+        and joined to all items in self.data in a single merge, each sheet only to the items of its own faculty.
+        a faculty whose sheet can't be read is reported in self.sheet_errors and keeps the data from the export.
+        '''
+        if self.data.empty:
+            return None
+        sheets: dict[str, pd.DataFrame] = {}
+        self.sheet_errors = {}
+        for faculty in self.data['faculty'].dropna().unique():
+            if faculty not in FACULTYNAMES:
+                continue
+            try:
+                sheets[faculty] = self.read_manual_sheet(faculty)
+            except Exception as e:
+                print(f"error in {faculty}: {e}")
+                self.sheet_errors[faculty] = str(e)
+        if not sheets:
+            return None
+        self.sheet_columns = {faculty: sheet.columns.tolist() for faculty, sheet in sheets.items()}
+        # the columns of the export in their order, for_faculty() puts them back like that for each faculty
+        self.export_dtypes = self.data.dtypes.to_dict()
+
+        manual = pd.concat(sheets, names=['faculty', 'url_id_x'])
+        codes = self.data['faculty'].cat.codes.to_numpy()
+        if (np.diff(np.where(codes < 0, codes.max() + 1, codes)) < 0).any():
+            # sorted on faculty (the compact export already is), so the rows of each faculty are a slice in for_faculty()
+            self.data = self.data.sort_values('faculty', kind='stable')
+        file_id = pd.to_numeric(self.data['url'].str.extract(CANVAS_FILE_ID, expand=False), errors='coerce').astype('Int64')
+        # as in add_student_sheet_data(): the sheets with a status or a manual classification replace the ones from the export,
+        # the items of the other faculties keep theirs (the status in for_faculty)
+        data = self.data.rename(columns={'Status': 'Status_recent'}) if 'Status' in manual.columns else self.data
+        if 'Manual classification' in manual.columns:
+            data = data.rename(columns={'Manual classification': 'export classification'})
+        if manual.index.is_unique:
+            # the common case: only the sheet columns are looked up, the columns of the export are reused as they are
+            keys = pd.MultiIndex.from_arrays([data['faculty'].astype('object'), file_id])
+            data = pd.concat([data, manual.reindex(keys).set_axis(data.index)], axis='columns')
+        else:
+            # joined on a copy of the faculty column, joining on the categorical itself turns it into text
+            data = data.assign(file_id=file_id, sheet=data['faculty'].astype('object')).join(manual, on=['sheet', 'file_id']).drop(columns=['sheet', 'file_id'])
+        if 'export classification' in data.columns:
+            export_classification = data.pop('export classification')
+            keep_export = ~data['faculty'].isin([faculty for faculty, sheet in sheets.items() if 'Manual classification' in sheet.columns])
+            if keep_export.any():
+                classification = data['Manual classification']
+                data['Manual classification'] = classification.mask(keep_export, export_classification.astype(classification.dtype))
+        self.data = data
+        self.data_grouped = self.data.groupby(by=['faculty'], observed=False)
+        self.faculty_rows = {}
+        self.masks = pd.DataFrame()
+        self.stats = {}
+        self.department_stats = {}
+
+    @profiled
+    def for_faculty(self, faculty: str) -> 'CopyRightData | None':
+        '''
+        returns a CopyRightData for faculty taken from this institution-wide one (no faculty, see add_all_student_sheet_data) without loading anything again:
+        its items, masks and department stats are selected from the ones calculated for all faculties at once.
+        the result is the same as CopyRightData(periods, faculty).get_data() gives.
+        returns None if faculty has no items, or its manual sheet couldn't be read (see self.sheet_errors)
+        '''
+        if self.faculty or self.data.empty or faculty in self.sheet_errors:
+            return None
+        if not self.faculty_rows:
+            self.faculty_rows = self.data.groupby(by='faculty', observed=True).indices
+        positions = self.faculty_rows.get(faculty)
+        if positions is None:
+            return None
+        if positions[-1] - positions[0] + 1 == len(positions):
+            positions = slice(positions[0], positions[-1] + 1)
+        dataclass = CopyRightData(periods=self.periods, faculty=faculty, compact=self.compact)
+        faculty_data = self.data.drop(columns='Expected fines', errors='ignore').iloc[positions]
+        sheet = self.sheet_columns.get(faculty, [])
+        if 'Status' not in sheet and 'Status_recent' in faculty_data.columns:
+            # another sheet has a status: this faculty keeps the one from the export
+            faculty_data = faculty_data.drop(columns='Status', errors='ignore').rename(columns={'Status_recent': 'Status'})
+        if 'Manual classification' not in sheet and 'Manual classification' in faculty_data.columns and 'Manual classification' in self.export_dtypes:
+            # another sheet has a manual classification: this faculty keeps the one from the export, with its type
+            faculty_data['Manual classification'] = faculty_data['Manual classification'].astype(self.export_dtypes['Manual classification'])
+        if self.export_dtypes:
+            # the columns in the order of add_student_sheet_data(): those of the export, then those of its own sheet in the order of the sheet
+            export = ['Status_recent' if column == 'Status' and 'Status' in sheet else column for column in self.export_dtypes
+                      if not (column == 'Manual classification' and column in sheet)]
+            faculty_data = faculty_data[[column for column in [*export, *sheet] if column in faculty_data.columns]]
+        # the columns without any value for this faculty are dropped as they are after joining only its own sheet, before adding Expected fines
+        dataclass.faculty_data = _finish_manual_join(faculty_data)
+        if 'Expected fines' in self.data.columns:
+            dataclass.faculty_data['Expected fines'] = self.data['Expected fines'].iloc[positions]
+        dataclass.masks = self.get_masks().iloc[positions]
+        # summed over the faculty's own rows: the totals of the groupby can differ in the last decimals
+        dataclass.calculate_stats()
+        dataclass.department_stats = self.get_department_stats().get(faculty, {})
+        return dataclass
+
+    def _faculty_columns(self) -> pd.DataFrame:
+        '''
+        returns for every faculty (rows) whether each column of self.data (columns) has any value for its items
+        '''
+        return self.data.notna().groupby(self.data['faculty'], observed=True).any()
         
     def get_stats(self) -> dict[str, Any]:
 
@@ -237,251 +1094,652 @@ class CopyRightData:
             self.calculate_stats()
         return self.stats
 
+    @profiled
     def calculate_stats(self, department:str|None = None) -> None:
         if not self.faculty_data.empty:
             if department:
-                calcdata = self.faculty_data[self.faculty_data['Department'] == department]
-            else:
-                calcdata = self.faculty_data
+                # all departments are calculated in one pass, see get_department_stats()
+                self.stats.update(self.get_department_stats().get(department, self._empty_stats()))
+                return None
+            calcdata = self.faculty_data
             for name, count in calcdata['Classification'].value_counts().items():
                 self.stats[name] = count
             self.stats['total_costs'] = calcdata['Expected fine'].sum()
-            self.stats['lange overname manual'] = self.get_long_excerpts(all=False, format=False, department=department).shape[0]
-            self.stats['total_costs_manual']= self.get_long_excerpts(all=False, format=False, department=department)['Expected fine'].sum()
+            needs_action = self.get_masks()['needs action']
+            self.stats['lange overname manual'] = int(needs_action.sum())
+            self.stats['total_costs_manual']= calcdata.loc[needs_action, 'Expected fine'].sum()
             self.stats['total_items'] = calcdata.shape[0]
-        else:
-            for name, details in self.data_grouped:
-                self.stats[name[0]] = {}
-                for key, value in details['Classification'].value_counts().items():
-                    self.stats[name[0]][key] = value
-                self.stats[name[0]]['total_costs'] = details['Expected fine'].sum()
+        elif not self.data.empty:
+            # all faculties in one groupby: {faculty: {<classification>: count, 'total_costs', ...}}
+            self.stats.update(self._grouped_stats(['faculty']).to_dict(orient='index'))
+            for faculty in FACULTYNAMES:
+                self.stats.setdefault(faculty, self._empty_stats())
+
+    @profiled
+    def get_department_stats(self) -> dict[str, dict[str, Any]]:
+        '''
+        returns the stats of every department in faculty_data, calculated with a single groupby:
+        {department: {<classification>: count, 'total_costs', 'lange overname manual', 'total_costs_manual', 'total_items'}}
+        without a faculty, those of all faculties: {faculty: {department: {...}}}
+        '''
+        if self.department_stats or self._items().empty:
+            return self.department_stats
+        if not self.faculty_data.empty:
+            self.department_stats = self._grouped_stats(['Department']).to_dict(orient='index')
+            return self.department_stats
+        for (faculty, department), stats in self._grouped_stats(['faculty', 'Department']).to_dict(orient='index').items():
+            self.department_stats.setdefault(faculty, {})[department] = stats
+        return self.department_stats
+
+    @profiled
+    def get_period_stats(self) -> dict[str, dict[str, Any]]:
+        '''
+        returns the stats of the faculty and of each department per period in self.periods, see period_aggregates():
+        {period: {'stats': {...}, 'departments': {department: {...}}}}
+        '''
+        if self.faculty_data.empty:
+            return {}
+        faculty = self._grouped_stats(['Period']).to_dict(orient='index')
+        period_stats = {period: {'stats': faculty.get(period, self._empty_stats()), 'departments': {}} for period in self.periods}
+        for (period, department), stats in self._grouped_stats(['Period', 'Department']).to_dict(orient='index').items():
+            if period in period_stats:
+                period_stats[period]['departments'][department] = stats
+        return period_stats
+
+    def _grouped_stats(self, by: list[str]) -> pd.DataFrame:
+        '''
+        returns the stats of calculate_stats() for every group of the items (see _items) by the columns in by, one row per group
+        '''
+        data = self._items()
+        groups = data.groupby(by, observed=True)
+        action = data.loc[self.get_masks()['needs action'].to_numpy(), [*by, 'Expected fine']].groupby(by, observed=True)
+        stats = groups['Classification'].value_counts().unstack(fill_value=0).reindex(columns=self._classifications(), fill_value=0)
+        stats['total_costs'] = groups['Expected fine'].sum()
+        stats['lange overname manual'] = action.size().reindex(stats.index, fill_value=0)
+        stats['total_costs_manual'] = action['Expected fine'].sum().reindex(stats.index, fill_value=0.0)
+        stats['total_items'] = groups.size()
+        return stats
+
+    def _items(self) -> pd.DataFrame:
+        # the items of the faculty, or of all faculties when there is no faculty_data
+        return self.faculty_data if not self.faculty_data.empty else self.data
+
+    def _classifications(self) -> list[str]:
+        classification = self._items()['Classification']
+        if isinstance(classification.dtype, pd.CategoricalDtype):
+            return classification.cat.categories.tolist()
+        return classification.dropna().unique().tolist()
 
+    def _empty_stats(self) -> dict[str, Any]:
+        stats = {name: 0 for name in self._classifications()}
+        stats.update({'total_costs': 0.0, 'lange overname manual': 0, 'total_costs_manual': 0.0, 'total_items': 0})
+        return stats
+
+    @profiled
     def format_costs(self):
         if not self.faculty_data.empty:
             if not self.stats:
                 self.stats['total_costs'] = self.faculty_data['Expected fine'].sum()
-            self.faculty_data['Expected fines'] = self.faculty_data['Expected fine'].dropna().apply(lambda x: format_currency(x, currency="EUR", locale="nl_NL")).astype('str')
+            self.faculty_data['Expected fines'] = EURO_FORMATTER.format(self.faculty_data['Expected fine']).astype('str')
             return self.faculty_data
-        else:
-            for name, details in self.data_grouped:
-                if not self.stats[name[0]]:
-                    self.stats[name[0]]['total_costs'] = details['Expected fine'].sum()
-                self.data_grouped[name].loc[:, 'Expected fines'] = details['Expected fine'].apply(lambda x: format_currency(x, currency="EUR", locale="nl_NL")).astype('str')
-            return self.data_grouped
+        elif not self.data.empty:
+            if not self.stats:
+                self.stats = {faculty: {'total_costs': costs} for faculty, costs in self.data.groupby('faculty', observed=False)['Expected fine'].sum().items()}
+            # assign instead of setting the column: self.data can be the export shared with other instances
+            self.data = self.data.assign(**{'Expected fines': EURO_FORMATTER.format(self.data['Expected fine']).astype('str')})
+            self.data_grouped = self.data.groupby(by=['faculty'], observed=False)
+        return self.data_grouped
 
+    @profiled
     def get_long_excerpts(self, all: bool = True, format:bool = True, department: str|None = None) -> pd.DataFrame | list[tuple[str, pd.DataFrame]]:
         '''
         returns a dataframe with all long excerpts or only thos that aren't overridden by manual classification
         '''
         if not self.faculty_data.empty:
-            self.all_long_excerpts = self.faculty_data[self.faculty_data['Classification'] == 'lange overname']
-            if 'Own_work' in self.faculty_data.columns:
-                self.all_long_excerpts = self.all_long_excerpts[~self.all_long_excerpts['Own_work'].isin(['Yes', 'yes'])]
-            if 'Free_for_use' in self.faculty_data.columns:
-                self.all_long_excerpts = self.all_long_excerpts[~self.all_long_excerpts['Free_for_use'].isin(['Yes', 'yes'])]
-            if 'Status_recent' in self.faculty_data.columns:
-                self.all_long_excerpts = self.all_long_excerpts[~self.all_long_excerpts['Status_recent'].isin(['Deleted', 'deleted'])]
-            if 'ML Prediction' in self.faculty_data.columns:
-                self.all_long_excerpts = self.all_long_excerpts[~self.all_long_excerpts['ML Prediction'].isin(['eigen materiaal - powerpoint'])]
-            cols = self.all_long_excerpts.columns.tolist()
-            if 'Status' in cols:
-                cols.insert(1,cols.pop(cols.index('Status')))
-            if 'Suggested action' in cols:
-                cols.insert(2,cols.pop(cols.index('Suggested action')))
-            if 'Extra notes' in cols:
-                cols.insert(3,cols.pop(cols.index('Extra notes')))
-            if 'Own_work' in cols:
-                cols.insert(4,cols.pop(cols.index('Own_work')))
-            if 'Free_for_use' in cols:
-                cols.insert(5,cols.pop(cols.index('Free_for_use')))
-            self.all_long_excerpts = self.all_long_excerpts[cols]
-
-            if all:
+            masks = self.get_masks()
+            rows = masks['long excerpt'] if all else masks['needs action']
+            if department and not all:
+                rows = rows & (self.faculty_data['Department'] == department)
+            if all or not format:
+                self.all_long_excerpts = self.faculty_data.loc[rows, self._long_excerpt_columns()]
                 return self.all_long_excerpts
-            else:
-                
-                self.all_long_excerpts = self.all_long_excerpts[~self.all_long_excerpts['Manual classification'].isin(['eigen materiaal - powerpoint', 'open access', 'eigen materiaal - overig'])]
-                if format:
-                    return self.format_long_excerpt(department=department)
-                else:
-                    if department:
-                        return self.all_long_excerpts[self.all_long_excerpts['Department'] == department]
-                    else:
-                        return self.all_long_excerpts
+            # select the rows and the formatted columns in one go, see format_long_excerpt()
+            return self._fill_title_owner(self.faculty_data.loc[rows, self._formatted_columns(self._long_excerpt_columns())])
         else:
-            for name, details in self.data_grouped:
-                tmp = details[details['Classification'] == 'lange overname']
-                tmp = tmp[details['Own_work'] != 'Yes']
-                tmp = tmp[details['Free_for_use'] != 'Yes']
-                if all:
-                    self.all_long_excerpts_grouped.append((name[0], tmp))
-                else:
-                    self.all_long_excerpts_grouped.append((name[0], tmp[~tmp['Manual classification'].isin(['eigen materiaal - powerpoint', 'open access', 'eigen materiaal - overig'])]))
+            # the rows of all faculties are selected at once and split by faculty: [(faculty, long excerpts)]
+            masks = self.get_masks()
+            if masks.empty:
+                return []
+            rows = masks['long excerpt'] if all else masks['needs action']
+            if department and not all:
+                rows = rows & (self.data['Department'] == department)
+            columns = self._long_excerpt_columns()
+            if format and not all:
+                columns = self._formatted_columns(columns)
+            present = self._faculty_columns()
+            self.all_long_excerpts_grouped = []
+            for name, details in self.data.loc[rows.to_numpy(), columns].groupby(by=['faculty'], observed=True):
+                details = details[[column for column in columns if present.loc[name[0], column]]]
+                if 'Manual classification' in columns and 'Manual classification' not in details.columns:
+                    details = details.assign(**{'Manual classification': '-'})
+                self.all_long_excerpts_grouped.append((name[0], self._fill_title_owner(details) if format and not all else details))
             return self.all_long_excerpts_grouped
 
+    def get_masks(self) -> pd.DataFrame:
+        '''
+        returns boolean columns aligned with faculty_data (or self.data without a faculty), calculated once per load:
+        - long excerpt: marked as 'lange overname' and not own work, free for use, deleted or a powerpoint according to the ML prediction
+        - excluded: overridden by the manual classification in the manual sheet
+        - needs action: long excerpts that are not excluded
+        '''
+        if not self.masks.empty or self._items().empty:
+            return self.masks
+        data = self._items()
+        long_excerpt = data['Classification'] == 'lange overname'
+        for column, values in LONG_EXCERPT_EXCLUSIONS:
+            if column in data.columns:
+                exclude = data[column].isin(values)
+                if column == 'Status_recent' and self.faculty_data.empty and self.sheet_columns:
+                    # only the faculties whose sheet has a status keep the one from the export as Status_recent, see for_faculty()
+                    exclude &= data['faculty'].isin([faculty for faculty, columns in self.sheet_columns.items() if 'Status' in columns])
+                long_excerpt &= ~exclude
+        excluded = data['Manual classification'].isin(MANUAL_EXCLUSIONS)
+        self.masks = pd.DataFrame({
+            'long excerpt': long_excerpt.fillna(False).astype('bool'),
+            'excluded': excluded.astype('bool'),
+        }, index=data.index)
+        self.masks['needs action'] = self.masks['long excerpt'] & ~self.masks['excluded']
+        return self.masks
+
+    def _long_excerpt_columns(self) -> list[str]:
+        cols = self._items().columns.tolist()
+        for position, column in enumerate(['Status', 'Suggested action', 'Extra notes', 'Own_work', 'Free_for_use'], start=1):
+            if column in cols:
+                cols.insert(position, cols.pop(cols.index(column)))
+        return cols
+
+    def _formatted_columns(self, cols: list[str]) -> list[str]:
+        cols = [col for col in cols if col not in ['url', 'Material id', 'Type', 'Auditor',  'Scope', 'Manual identifier', 'Pages * Students']]
+        return cols[-1:] + cols[:-1]
+
+    def _fill_title_owner(self, data: pd.DataFrame) -> pd.DataFrame:
+        # categorical columns (compact mode) can only be filled with one of their categories
+        categorical = {col: data[col].cat.add_categories('') for col in ['Title', 'Owner']
+                       if col in data.columns and isinstance(data[col].dtype, pd.CategoricalDtype) and '' not in data[col].cat.categories}
+        return data.assign(**categorical).fillna({'Title': '', 'Owner': ''})
+
     def format_long_excerpt(self, department:str|None = None) -> pd.DataFrame:
         return_data = self.all_long_excerpts
-        return_data['Title'] = return_data['Title'].fillna('')
-        return_data['Owner'] = return_data['Owner'].fillna('')
-        return_data.drop(['url', 'Material id', 'Type', 'Auditor',  'Scope', 'Manual identifier', 'Pages * Students'], axis=1, inplace=True)
-        cols = return_data.columns.tolist()
-        cols = cols[-1:] + cols[:-1]
-        return_data = return_data[cols]
-        if not department:
-            return_data.sort_values('Department')
-        else:
+        if department:
             return_data = return_data[return_data['Department'] == department]
-
-        return return_data
+        return self._fill_title_owner(return_data[self._formatted_columns(return_data.columns.tolist())])
 
     def get_programme_list(self) -> list[str]:
         '''
         returns a list of all programmes in the data
         '''
         if not self.faculty_data.empty:
-            programmes = self.faculty_data['Department'].unique().tolist()
+            # in the order of their first item by the file id in the url (as text), the order of the department pages of the dashboards
+            file_ids = self.faculty_data['url'].str.replace(CANVAS_FILES_URL, '', regex=False).str.replace('?', '', regex=False)
+            order = file_ids.reset_index(drop=True).sort_values(kind='stable').index
+            programmes = self.faculty_data['Department'].iloc[order].unique().tolist()
             print(programmes)
             return programmes
         
 
-def create_qmds(periods: list[str] = None) -> None:
+# per-faculty tables + stats written by create_qmds(precompute=True), loaded by the dashboards
+DASHBOARD_DATA_DIR = 'dashboard_data'
+
+@profiled
+def write_dashboard_data(faculty: str, dataclass: CopyRightData, stats: dict[str, Any], dept_stats: dict[str, dict[str, Any]]) -> None:
     '''
-    creates a qmd file for each faculty
-    afterwards, run quarto render dashboard_<faculty>.qmd to create each dashboard
-    use single-file-cli (https://github.com/gildas-lormeau/single-file-cli) to combine the js/css/images for the dashboard into the .html file itself. 
+    stores everything a dashboard shows for faculty in DASHBOARD_DATA_DIR/<faculty>:
+    - stats.json: the faculty stats and the stats per department
+    - long_excerpts.feather: all items marked as 'lange overname'
+    - action.feather: all items in need of action, the department tables are selected from this
+    '''
+    if feather is None:
+        raise Exception('pyarrow is not installed, cannot store the precomputed dashboard data')
+    path = os.path.join(DASHBOARD_DATA_DIR, faculty)
+    os.makedirs(path, exist_ok=True)
+    _write_table(dataclass.get_long_excerpts(all=True), os.path.join(path, 'long_excerpts.feather'))
+    _write_table(dataclass.get_long_excerpts(all=False), os.path.join(path, 'action.feather'))
+    _write_json(os.path.join(path, 'stats.json'), {
+        'version': CACHE_VERSION,
+        'faculty': faculty,
+        'periods': dataclass.get_periods(),
+        'stats': _jsonable(stats),
+        'departments': {dept: _jsonable(values) for dept, values in dept_stats.items()},
+    })
 
-    a powershell script is provided in the repo to do this automatically - make_dashboards.ps1. Make sure to install quarto, single-file-cli, and uv first, and activate the uv venv before running the script.
+def load_dashboard_data(faculty: str) -> dict[str, Any]:
     '''
-    if not periods:
-        periods = ['2022', '2022-2A', '2022-2B', '2022-JAAR', '2022-SEM 2']
-    for faculty in FACULTYNAMES:
+    reads the data stored by write_dashboard_data() for faculty.
+    returns a dict with keys stats, departments, long_excerpts and action
+    '''
+    path = os.path.join(DASHBOARD_DATA_DIR, faculty)
+    with open(os.path.join(path, 'stats.json'), 'r', encoding='utf-8') as f:
+        dashboard = json.load(f)
+    dashboard['long_excerpts'] = feather.read_feather(os.path.join(path, 'long_excerpts.feather'), memory_map=True)
+    dashboard['action'] = feather.read_feather(os.path.join(path, 'action.feather'), memory_map=True)
+    return dashboard
+
+def _write_table(data: pd.DataFrame, filepath: str) -> None:
+    data = data.reset_index(drop=True)
+    try:
+        feather.write_feather(data, filepath)
+    except Exception:
+        feather.write_feather(_mixed_as_text(data), filepath)
+
+def _mixed_as_text(data: pd.DataFrame) -> pd.DataFrame:
+    # columns from the manual sheets can mix numbers and text, store those as text
+    return data.assign(**{col: data[col].map(lambda x: x if pd.isna(x) else str(x)) for col in data.columns if data[col].dtype == object})
+
+def _finish_manual_join(faculty_data: pd.DataFrame) -> pd.DataFrame:
+    '''
+    drops the columns without any value after joining the manual sheet, and fills in a missing manual classification
+    '''
+    faculty_data = faculty_data.dropna(axis='columns', how='all')
+    if 'Manual classification' not in faculty_data.columns:
+        faculty_data['Manual classification'] = '-'
+    return faculty_data
+
+def _jsonable(stats: dict[str, Any]) -> dict[str, Any]:
+    return {str(key): value.item() if hasattr(value, 'item') else value for key, value in stats.items()}
+
+# tables of the dashboards in paginated mode, see PagedTable
+PAGE_SIZE = 25
+PAGED_TABLE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'paged_table.js')
+_paged_table_ids = itertools.count()
+
+def table_payload(data: pd.DataFrame) -> str:
+    '''
+    returns data as gzipped columnar json, base64 encoded: {"columns": [...], "data": [[values of the first column], ...]}
+    '''
+    values = [data.iloc[:, i].astype(object).where(data.iloc[:, i].notna(), None).tolist() for i in range(data.shape[1])]
+    content = json.dumps({'columns': [str(column) for column in data.columns], 'data': values}, ensure_ascii=False, default=str)
+    return base64.b64encode(gzip.compress(content.encode('utf-8'), mtime=0)).decode('ascii')
+
+class PagedTable:
+    '''
+    shows data in a dashboard as a table with pages of page_size rows, search and csv download (see paged_table.js).
+    the rows are embedded as a compressed payload and only decoded in the browser once the table is in view,
+    so the page stays small and opens fast regardless of the number of rows. works without a server, e.g. after single-file.
+    '''
+
+    def __init__(self, data: pd.DataFrame, name: str = 'table', page_size: int = PAGE_SIZE):
+        self.data = data
+        self.name = name
+        self.page_size = page_size
+
+    def _repr_html_(self) -> str:
+        # paged_table.js itself is added to the page once, see paged_table_include()
+        table_id = f'ea-table-{next(_paged_table_ids)}'
+        return (f'<div class="ea-table" data-payload="{table_id}" data-page-size="{self.page_size}" data-name="{html.escape(self.name)}">Loading {len(self.data)} items...</div>\n'
+                f'<script type="application/gzip" id="{table_id}">{table_payload(self.data)}</script>')
+
+def paged_table_include() -> str:
+    '''
+    returns the dashboard options that add paged_table.js to the head of the page, once for all its PagedTables
+    '''
+    with open(PAGED_TABLE_SCRIPT, 'r', encoding='utf-8') as f:
+        script = f.read()
+    return '\n        include-in-header:\n            text: |\n' + textwrap.indent(f'<script>\n{script}</script>', ' ' * 16)
+
+# fingerprints of the inputs of the dashboards that were last built, see changed_faculties()
+DASHBOARD_STATE = os.path.join(CACHE_DIR, 'dashboard_state.json')
+# columns of the export that are hashed to detect changed items of a faculty
+FINGERPRINT_COLUMNS = ['Material id', 'Last change', 'Status']
+
+def faculty_fingerprint(faculty: str, periods: list[str], precompute: bool = False, filepath: str = 'copyright_export.csv', compact: bool = False, paginate: bool = False) -> str:
+    '''
+    returns a hash of everything a dashboard for faculty depends on:
+    the FINGERPRINT_COLUMNS of its items in the export, its manual sheet, the periods and the precompute and paginate modes
+    '''
+    sha256 = hashlib.sha256(json.dumps({'periods': list(periods), 'precompute': precompute, 'paginate': paginate}).encode('utf-8'))
+    rows = load_export(filepath, periods, get_faculty_mapping(), compact=compact).faculties.get(faculty)
+    if rows is not None:
+        sha256.update(pd.util.hash_pandas_object(rows[FINGERPRINT_COLUMNS], index=False).to_numpy().tobytes())
+    manual_sheet = os.path.join('manual_sheets', f'{faculty}.csv')
+    if os.path.exists(manual_sheet):
+        sha256.update(file_fingerprint(manual_sheet)['sha256'].encode('utf-8'))
+    return sha256.hexdigest()
+
+def read_dashboard_state() -> dict[str, dict[str, str]]:
+    try:
+        with open(DASHBOARD_STATE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_dashboard_state(stage: str, fingerprints: dict[str, str]) -> None:
+    '''
+    records the fingerprints of the faculties whose dashboards were built up to stage ('qmd' or 'html')
+    '''
+    state = read_dashboard_state()
+    state.setdefault(stage, {}).update(fingerprints)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _write_json(DASHBOARD_STATE, state)
+
+def changed_faculties(faculties: list[str], periods: list[str], precompute: bool = False, stage: str = 'qmd', compact: bool = False, paginate: bool = False) -> dict[str, str]:
+    '''
+    returns {faculty: fingerprint} for the faculties that need to be built again up to stage:
+    their inputs changed since the last build, or the output of the stage (dashboard_<faculty>.<stage>) is missing
+    '''
+    built = read_dashboard_state().get(stage, {})
+    changed = {}
+    for faculty in faculties:
+        fingerprint = faculty_fingerprint(faculty, periods, precompute, compact=compact, paginate=paginate)
+        outputs = [f'dashboard_{faculty}.{stage}']
+        if precompute:
+            outputs.append(os.path.join(DASHBOARD_DATA_DIR, faculty, 'stats.json'))
+        if built.get(faculty) != fingerprint or not all(os.path.exists(output) for output in outputs):
+            changed[faculty] = fingerprint
+    return changed
+
+# stats per period and faculty, see period_aggregates()
+AGGREGATES_DIR = os.path.join(CACHE_DIR, 'aggregates')
+AGGREGATES_VERSION = 1
+
+def period_aggregates(periods: list[str], filepath: str = 'copyright_export.csv', faculties: list[str] | None = None) -> dict[str, dict[str, dict[str, Any]]]:
+    '''
+    returns the stats of each faculty and its departments per period, the same stats as CopyRightData.get_stats():
+    {period: {faculty: {'stats': {...}, 'departments': {department: {...}}}}}
+    the aggregates are cached per period in AGGREGATES_DIR and reused as long as the export, the mapping and the manual sheets are unchanged.
+    the periods that aren't cached yet are calculated together, in one pass over the export.
+    '''
+    faculties = faculties if faculties else FACULTYNAMES
+    cached = {period: _read_aggregate(period) for period in periods}
+    source = file_fingerprint(filepath, previous=next((aggregate['source'] for aggregate in cached.values() if aggregate), None))
+    key = _aggregates_key(source, faculties)
+    aggregates = {period: aggregate['faculties'] for period, aggregate in cached.items() if aggregate and aggregate['key'] == key}
+    missing = [period for period in periods if period not in aggregates]
+    if missing:
+        calculated, complete = calculate_period_aggregates(missing, filepath, faculties)
+        if complete:
+            os.makedirs(AGGREGATES_DIR, exist_ok=True)
+            for period in missing:
+                _write_json(_aggregate_path(period), {'version': AGGREGATES_VERSION, 'period': period, 'key': key, 'source': source, 'faculties': calculated[period]})
+        aggregates.update(calculated)
+    return {period: aggregates[period] for period in periods}
+
+def calculate_period_aggregates(periods: list[str], filepath: str = 'copyright_export.csv', faculties: list[str] | None = None) -> tuple[dict[str, dict[str, dict[str, Any]]], bool]:
+    '''
+    calculates the aggregates of period_aggregates() for periods, without the cache.
+    returns the aggregates + whether all faculties succeeded (faculties that fail are left out and reported)
+    '''
+    faculties = faculties if faculties else FACULTYNAMES
+    export = load_export(filepath, periods, get_faculty_mapping())
+    aggregates: dict[str, dict[str, dict[str, Any]]] = {period: {} for period in periods}
+    complete = True
+    for faculty in faculties:
+        if faculty not in export.faculties:
+            continue
+        dataclass = CopyRightData(periods=periods, faculty=faculty)
+        dataclass.faculty_data = export.get_faculty(faculty)
         try:
-            print(faculty)
-            dataclass = CopyRightData(periods=periods, faculty=faculty)
-            data: pd.DataFrame = dataclass.get_data()
-            stats: dict = dataclass.get_stats()
-            
-            total_costs_manual = format_compact_currency(stats['total_costs_manual'], currency="EUR", locale="nl_NL").replace(u'\xa0','')
+            dataclass.add_student_sheet_data()
         except Exception as e:
             print(f"error in {faculty}: {e}")
+            complete = False
             continue
-        
+        for period, stats in dataclass.get_period_stats().items():
+            aggregates[period][faculty] = {'stats': _jsonable(stats['stats']),
+                                           'departments': {str(dept): _jsonable(values) for dept, values in stats['departments'].items()}}
+    return aggregates, complete
+
+def _aggregate_path(period: str) -> str:
+    return os.path.join(AGGREGATES_DIR, f"period_{hashlib.sha256(period.encode('utf-8')).hexdigest()[:16]}.json")
+
+def _read_aggregate(period: str) -> dict[str, Any] | None:
+    try:
+        with open(_aggregate_path(period), 'r', encoding='utf-8') as f:
+            aggregate = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return aggregate if aggregate.get('version') == AGGREGATES_VERSION and aggregate.get('period') == period else None
+
+def _aggregates_key(source: dict, faculties: list[str]) -> str:
+    '''
+    returns a hash of everything the aggregates depend on: the export, the mapping and the manual sheets of faculties
+    '''
+    sheets = {}
+    for faculty in faculties:
+        manual_sheet = os.path.join('manual_sheets', f'{faculty}.csv')
+        sheets[faculty] = file_fingerprint(manual_sheet)['sha256'] if os.path.exists(manual_sheet) else None
+    content = {'export': source['sha256'], 'mapping': get_faculty_mapping().checksum(), 'sheets': sheets}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+def period_trend(aggregates: dict[str, dict[str, dict[str, Any]]], stat: str = 'lange overname manual', faculty: str | None = None) -> pd.DataFrame:
+    '''
+    returns stat per period (rows) and faculty (columns) from the output of period_aggregates().
+    if faculty is given, the columns are the departments of that faculty.
+    '''
+    if faculty:
+        rows = {period: {dept: values.get(stat, 0) for dept, values in faculties.get(faculty, {}).get('departments', {}).items()}
+                for period, faculties in aggregates.items()}
+    else:
+        rows = {period: {name: values['stats'].get(stat, 0) for name, values in faculties.items()} for period, faculties in aggregates.items()}
+    trend = pd.DataFrame.from_dict(rows, orient='index').reindex(list(aggregates)).fillna(0)
+    trend.index.name = 'period'
+    return trend
+
+def year_over_year(aggregates: dict[str, dict[str, dict[str, Any]]], stat: str = 'lange overname manual', faculty: str | None = None) -> pd.DataFrame:
+    '''
+    sums the period_trend() per year (the first 4 characters of the period, e.g. 2022 for 2022-2A)
+    and adds the difference and relative change with the year before: columns (total|delta|change, faculty or department)
+    '''
+    trend = period_trend(aggregates, stat=stat, faculty=faculty)
+    yearly = trend.groupby(trend.index.str[:4]).sum().sort_index()
+    yearly.index.name = 'year'
+    return pd.concat({'total': yearly, 'delta': yearly.diff(), 'change': yearly.pct_change()}, axis=1)
+
+def print_frame(data: pd.DataFrame, title: str) -> None:
+    table = Table(title=title)
+    table.add_column(str(data.index.name or ''))
+    for column in data.columns:
+        table.add_column(' '.join(map(str, column)) if isinstance(column, tuple) else str(column), justify='right')
+    for index, row in data.iterrows():
+        table.add_row(str(index), *['-' if pd.isna(value) else f'{value:,.2f}'.rstrip('0').rstrip('.') for value in row])
+    Console().print(table)
 
-        totalstring = f'''---
+# partials of the dashboard qmd files, see create_qmd()
+QMD_HEADER = Template('''---
 title: "Dashboard Easy Access"
 author: "cip@utwente.nl"
 format:
     dashboard:
         logo: easy_access_logo_beach.svg
-        html-table-processing: none
+        html-table-processing: none$includes
         theme:
             - litera
             - custom.scss
 ---
-```{{python}}
+```{python}
 #| echo: false
 #| output: false
 import pandas as pd
 from itables import show, init_notebook_mode
-from make_report import CopyRightData
+$setup
+```
+''')
+QMD_SETUP_PRECOMPUTED = Template('''from make_report import load_dashboard_data$itables
+dashboard = load_dashboard_data('$faculty')''')
+QMD_SETUP = Template('''from make_report import CopyRightData
 from babel.numbers import format_compact_currency
-from IPython.display import display, Markdown
-init = init_notebook_mode(all_interactive=True, connected=True)
-faculty = '{faculty}'
-periods = ['2022', '2022-2A', '2022-2B', '2022-JAAR', '2022-SEM 2']
+from IPython.display import display, Markdown$itables
+faculty = '$faculty'
+periods = $periods
 dataclass = CopyRightData(periods=periods, faculty=faculty)
 data = dataclass.get_data()
 stats: dict = dataclass.get_stats()
-total_costs_manual = format_compact_currency(stats['total_costs_manual'], currency="EUR", locale="nl_NL").replace(u'\xa0','')
-```
-# Overview {faculty}
+total_costs_manual = format_compact_currency(stats['total_costs_manual'], currency="EUR", locale="nl_NL").replace(u'\xa0','')''')
+# the itables setup, left out of the paginated dashboards that show their tables with PagedTable
+QMD_ITABLES_SETUP = '\ninit = init_notebook_mode(all_interactive=True, connected=True)'
+QMD_SECTION = Template('''# $title
 ## Row
-```{{python}}
-#| content: valuebox
-#| title: "Possible fine"
-dict(
-icon = "currency-exchange",
-color = "danger",
-value = '{total_costs_manual}'
-
-)
-```
-```{{python}}
-#| content: valuebox
-#| title: "# of scanned documents"
-dict(
-icon = "stack-overflow",
-color = "info",
-value = {str(stats['total_items'])}
-)
-```
-```{{python}}
+''')
+QMD_VALUEBOX = Template('''```{python}
 #| content: valuebox
-#| title: "# of infractions"
+#| title: "$title"
 dict(
-icon = "exclamation-square-fill",
-color = "warning",
-value = {str(stats['lange overname manual'])}
+icon = "$icon",
+color = "$color",
+value = $value
 )
 ```
-## Row
-```{{python}}
-#| title: All items in need of action
-show(dataclass.get_long_excerpts(all=False), buttons = ['copy', 'excel', 'pdf'], showIndex=False)
-```
-```{{python}}
-#| title: All items marked as 'lange overname' by Copyright Tool
-show(dataclass.get_long_excerpts(all=True), buttons = ['copy', 'excel', 'pdf'], showIndex=False)
-```
+''')
+QMD_ROW = '''## Row
 '''
-        dept_data = {}
-        programme_list = dataclass.get_programme_list()
+QMD_TABLE = Template('''```{python}
+$options$table
+```
+''')
+
+def create_qmds(periods: list[str] = None, precompute: bool = False, incremental: bool = False, compact: bool = False, backend: str = 'pandas', paginate: bool = False,
+                batch: bool = False) -> list[str]:
+    '''
+    creates a qmd file for each faculty
+    afterwards, run quarto render dashboard_<faculty>.qmd to create each dashboard
+    use single-file-cli (https://github.com/gildas-lormeau/single-file-cli) to combine the js/css/images for the dashboard into the .html file itself. 
+
+    if precompute is True, the tables and stats for each faculty are stored in DASHBOARD_DATA_DIR and the dashboards only load those,
+    instead of processing the copyright data again while rendering.
+    if incremental is True, only the faculties whose items or manual sheet changed since the last run are created again.
+    if compact is True, the export is kept in memory in compact form, see load_export().
+    backend 'polars' processes each faculty as a lazy polars query instead, see query_faculty().
+    the fingerprints of the faculties (see faculty_fingerprint) need the export loaded with pandas, so with backend 'polars' they are only
+    recorded when incremental is True.
+    if paginate is True, the tables are embedded as compressed payloads shown in pages (see PagedTable) instead of with itables.
+    keep the scripts when inlining those dashboards: single-file --block-scripts false
+    if batch is True, all faculties are processed in one pass over the export (see CopyRightData.for_faculty) instead of one by one,
+    with the same result; backend is not used then. if the batch fails, the faculties are loaded one by one instead.
+    returns the faculties that were (re)created.
+
+    a powershell script is provided in the repo to do this automatically - make_dashboards.ps1. Make sure to install quarto, single-file-cli, and uv first, and activate the uv venv before running the script.
+    '''
+    if not periods:
+        periods = DEFAULT_PERIODS
+    faculties = FACULTYNAMES
+    if incremental:
+        changed = changed_faculties(FACULTYNAMES, periods, precompute=precompute, compact=compact, paginate=paginate)
+        faculties = [faculty for faculty in FACULTYNAMES if faculty in changed]
+        print(f"unchanged, skipped: {', '.join(faculty for faculty in FACULTYNAMES if faculty not in changed) or '-'}")
+    institution = None
+    if batch and faculties:
+        try:
+            institution = CopyRightData(periods=periods, compact=compact)
+            institution.get_data()
+        except Exception as e:
+            print(f"error in batch mode, loading the faculties one by one: {e}")
+            institution = None
+    refreshed = []
+    for faculty in faculties:
+        try:
+            print(faculty)
+            # without a batch result (e.g. its manual sheet is missing) the faculty is loaded on its own, which reports why
+            create_qmd(faculty, periods, precompute=precompute, compact=compact, backend=backend, paginate=paginate,
+                       dataclass=institution.for_faculty(faculty) if institution else None)
+        except Exception as e:
+            print(f"error in {faculty}: {e}")
+            continue
+        refreshed.append(faculty)
+        if incremental:
+            save_dashboard_state('qmd', {faculty: changed[faculty]})
+        elif backend != 'polars' or institution is not None:
+            save_dashboard_state('qmd', {faculty: faculty_fingerprint(faculty, periods, precompute, compact=compact, paginate=paginate)})
+    if incremental:
+        print(f"refreshed: {', '.join(refreshed) or '-'}")
+    return refreshed
+
+@profiled
+def create_qmd(faculty: str, periods: list[str], precompute: bool = False, compact: bool = False, backend: str = 'pandas', paginate: bool = False,
+               dataclass: CopyRightData | None = None) -> None:
+    '''
+    creates dashboard_<faculty>.qmd, see create_qmds().
+    dataclass is the already loaded data of the faculty, if given (see CopyRightData.for_faculty)
+    '''
+    if dataclass is None:
+        dataclass = CopyRightData(periods=periods, faculty=faculty, compact=compact, backend=backend)
+        dataclass.get_data()
+    stats: dict = dict(dataclass.get_stats())
+    total_costs_manual = EURO_FORMATTER.format_compact(pd.Series([stats['total_costs_manual']])).iloc[0].replace(u'\xa0','')
+
+    dept_data = {}
+    programme_list = dataclass.get_programme_list()
+    department_stats = dataclass.get_department_stats()
+    for dept in programme_list:
+        dept_data[dept] = {}
+        dept_data[dept]['stats'] = department_stats[dept]
+    # format the value box amounts of all departments in one go
+    dept_costs = pd.DataFrame([details['stats'] for details in dept_data.values()], index=list(dept_data), columns=['total_costs', 'total_costs_manual'])
+    dept_costs = dept_costs.apply(lambda costs: EURO_FORMATTER.format_compact(costs).str.replace(u'\xa0',''))
+    for dept in dept_data:
+        dept_data[dept]['total_costs'] = dept_costs.loc[dept, 'total_costs']
+        dept_data[dept]['total_costs_manual'] = dept_costs.loc[dept, 'total_costs_manual']
+
+    if precompute:
+        write_dashboard_data(faculty, dataclass, stats, {dept: details['stats'] for dept, details in dept_data.items()})
+        setup = QMD_SETUP_PRECOMPUTED.substitute(faculty=faculty, itables='' if paginate else QMD_ITABLES_SETUP)
+        action_table = "dashboard['action']"
+        all_table = "dashboard['long_excerpts']"
+    else:
+        setup = QMD_SETUP.substitute(faculty=faculty, periods=repr(periods), itables='' if paginate else QMD_ITABLES_SETUP)
+        action_table = "dataclass.get_long_excerpts(all=False)"
+        all_table = "dataclass.get_long_excerpts(all=True)"
+    if paginate:
+        setup += '\nfrom make_report import PagedTable'
+
+    def department_sections() -> Iterator[str]:
         for dept in programme_list:
-            dataclass.calculate_stats(department=dept)
-            dept_data[dept] = {}
-            dept_data[dept]['stats'] = dataclass.get_stats()
-            dept_data[dept]['total_costs'] = format_compact_currency(dept_data[dept]['stats']['total_costs'], currency="EUR", locale="nl_NL").replace(u'\xa0','')
-            total_costs_manual = format_compact_currency(dept_data[dept]['stats']['total_costs_manual'], currency="EUR", locale="nl_NL").replace(u'\xa0','')
-            totalstring += f'''
-# {dept.split(':')[0]}
-## Row
-```{{python}}
-#| content: valuebox
-#| title: "Possible fine"
-dict(
-icon = "currency-exchange",
-color = "danger",
-value = '{total_costs_manual.replace(u'\0xAC', '€').replace(u'\FFFD', '' )}'
+            if precompute:
+                dept_table = f"dashboard['action'][dashboard['action']['Department'] == {dept!r}]"
+            else:
+                dept_table = f"dataclass.get_long_excerpts(all=False, department='{dept}')"
+            yield '\n'
+            yield from qmd_section(dept.split(':')[0], dept_data[dept]['total_costs_manual'], dept_data[dept]['stats'],
+                                   [qmd_table(dept_table, dept.split(':')[0], paginate=paginate)])
 
-)
-```
-```{{python}}
-#| content: valuebox
-#| title: "# of scanned documents"
-dict(
-icon = "stack-overflow",
-color = "info",
-value = {str(dept_data[dept]['stats']['total_items'])}
-)
-```
-```{{python}}
-#| content: valuebox
-#| title: "# of infractions"
-dict(
-icon = "exclamation-square-fill",
-color = "warning",
-value = {str(dept_data[dept]['stats']['lange overname manual'])}
-)
-```
-## Row
-```{{python}}
-show(dataclass.get_long_excerpts(all=False, department='{dept}'), buttons = ['copy', 'excel', 'pdf'], showIndex=False)
-```
-'''
+    write_qmd(faculty, itertools.chain(
+        [QMD_HEADER.substitute(setup=setup, includes=paged_table_include() if paginate else '')],
+        qmd_section(f'Overview {faculty}', total_costs_manual, stats, [
+            qmd_table(action_table, 'action', title='All items in need of action', paginate=paginate),
+            qmd_table(all_table, 'long_excerpts', title="All items marked as 'lange overname' by Copyright Tool", paginate=paginate),
+        ]),
+        department_sections(),
+    ))
+
+@profiled
+def write_qmd(faculty: str, parts: Iterable[str]) -> None:
+    '''
+    writes the parts of dashboard_<faculty>.qmd to the file as they are produced, without joining them into one string first
+    '''
+    with open(f'dashboard_{faculty}.qmd', 'w', encoding='utf-8') as f:
+        f.writelines(parts)
+
+def qmd_section(title: str, costs: str, stats: dict[str, Any], tables: list[str]) -> Iterator[str]:
+    '''
+    yields a dashboard page: the title, a row with the value boxes for costs (formatted) and the stats, and a row with the tables (see qmd_table).
+    add other pages (e.g. per course) to create_qmd() by chaining more sections.
+    '''
+    yield QMD_SECTION.substitute(title=title)
+    # the possible fine has an empty line after it in the original layout
+    yield QMD_VALUEBOX.substitute(title='Possible fine', icon='currency-exchange', color='danger', value=f"'{costs}'\n")
+    yield QMD_VALUEBOX.substitute(title='# of scanned documents', icon='stack-overflow', color='info', value=str(stats['total_items']))
+    yield QMD_VALUEBOX.substitute(title='# of infractions', icon='exclamation-square-fill', color='warning', value=str(stats['lange overname manual']))
+    yield QMD_ROW
+    yield from tables
+
+def qmd_table(source: str, name: str, title: str | None = None, paginate: bool = False) -> str:
+    '''
+    returns a cell that shows the table in the python expression source, with itables or as a PagedTable named name
+    '''
+    if paginate:
+        table = f'PagedTable({source}, name={name!r})'
+    else:
+        table = f"show({source}, buttons = ['copy', 'excel', 'pdf'], showIndex=False)"
+    return QMD_TABLE.substitute(options=f'#| title: {title}\n' if title else '', table=table)
 
-        with open(f'dashboard_{faculty}.qmd', 'w', encoding='utf-8') as f:
-            f.write(totalstring)
-    
 
 def test_one(faculty: str, periods: list[str]):
     dataclass = CopyRightData(periods=periods, faculty=faculty)
@@ -501,5 +1759,36 @@ if __name__ == '__main__':
     #periods=['2022', '2022-2A', '2022-2B', '2022-JAAR', '2022-SEM 2']
     #test_one(faculty, periods)
 
-    # create qmd dashboard files for each faculty in FACULTYNAMES
-    create_qmds()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='create the Easy Access dashboard qmd files for each faculty in FACULTYNAMES')
+    parser.add_argument('--periods', nargs='+', default=DEFAULT_PERIODS, help='periods to include')
+    parser.add_argument('--compare', nargs='+', default=None, metavar='PERIOD', help='print the trend and year-over-year change of --stat over these periods, then exit')
+    parser.add_argument('--stat', default='lange overname manual', help="stat to compare, e.g. 'total_costs_manual' or 'total_items' (default: the number of infractions)")
+    parser.add_argument('--rebuild-cache', action='store_true', help='parse copyright_export.csv again and overwrite the cached typed export, then exit')
+    parser.add_argument('--precompute', action='store_true', help=f'store the tables and stats per faculty in {DASHBOARD_DATA_DIR}/ so the dashboards only load them')
+    parser.add_argument('--incremental', action='store_true', help='only create the qmd files of faculties whose items or manual sheet changed since the last run')
+    parser.add_argument('--compact', action='store_true', help='keep the export in memory in compact form (categoricals, arrow strings, downcast integers)')
+    parser.add_argument('--backend', choices=BACKENDS, default='pandas', help='process the faculties with pandas, or as lazy polars queries on all cores (needs polars)')
+    parser.add_argument('--paginate', action='store_true', help='embed the tables as compressed payloads shown in pages, for faculties with many items')
+    parser.add_argument('--batch', action='store_true', help='process all faculties in one pass over the export and manual sheets, instead of one by one')
+    parser.add_argument('--profile', default=None, metavar='PATH', help='record the time, rows and memory use of every stage per faculty, write them to PATH (.json or .csv) and print a summary')
+    parser.add_argument('--memory-report', action='store_true', help='print the memory use per column of the export before and after compacting it, then exit')
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling()
+    if args.rebuild_cache:
+        rebuild_export_cache(periods=args.periods)
+    elif args.compare:
+        aggregates = period_aggregates(args.compare)
+        print_frame(period_trend(aggregates, stat=args.stat), f'{args.stat} per period')
+        print_frame(year_over_year(aggregates, stat=args.stat), f'{args.stat} per year')
+    elif args.memory_report:
+        export = load_export('copyright_export.csv', args.periods, get_faculty_mapping())
+        print_memory_report(memory_report(export.data, compact_export(export.data)))
+    else:
+        # create qmd dashboard files for each faculty in FACULTYNAMES
+        create_qmds(periods=args.periods, precompute=args.precompute, incremental=args.incremental, compact=args.compact, backend=args.backend, paginate=args.paginate,
+                    batch=args.batch)
+    if args.profile:
+        write_profile(args.profile)
+        print_profile()
+        print(f"profile written to {args.profile}")
\ No newline at end of file
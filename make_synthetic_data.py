@@ -0,0 +1,147 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from rich import print
+
+from make_report import FACULTYNAMES, DEFAULT_PERIODS, EXPORT_DTYPES, MANUAL_SHEET_COLUMNS
+
+'''
+Generates a synthetic data set with the same layout as the real input files, for testing and benchmarking:
+- copyright_export.csv, with the columns from EXPORT_DTYPES (+ Google search file)
+- manual_sheets/<faculty>.csv, with url_id_x + MANUAL_SHEET_COLUMNS for part of the items of each faculty
+- faculty_course_mapping.csv, mapping each course code + name to a faculty
+
+The content is random but realistic enough to exercise all code paths: a share of the items is 'lange overname',
+some are own work / free for use / deleted, and the manual sheets override part of the classifications.
+'''
+
+CLASSIFICATIONS = ['lange overname', 'korte overname', 'eigen materiaal', 'open access', 'onbekend']
+ML_PREDICTIONS = ['lange overname', 'korte overname', 'eigen materiaal - powerpoint', 'eigen materiaal - overig', 'onbekend']
+MANUAL_CLASSIFICATIONS = ['lange overname', 'eigen materiaal - powerpoint', 'eigen materiaal - overig', 'open access', 'korte overname']
+PERIOD_SUFFIXES = ['', '-1A', '-1B', '-2A', '-2B', '-JAAR', '-SEM 1', '-SEM 2']
+
+
+def make_periods(count: int) -> list[str]:
+    '''
+    returns count periods: DEFAULT_PERIODS first, then the periods of earlier years
+    '''
+    periods = list(DEFAULT_PERIODS)
+    year = int(DEFAULT_PERIODS[0][:4])
+    while len(periods) < count:
+        year -= 1
+        periods.extend(f'{year}{suffix}' for suffix in PERIOD_SUFFIXES)
+    return periods[:count]
+
+def make_export(rows: int, faculties: list[str], departments: int, periods: list[str], courses: int, rng: np.random.Generator) -> tuple[pd.DataFrame, dict[str, str]]:
+    '''
+    returns a synthetic export with rows items + the mapping of course names to faculties
+    '''
+    course_ids = np.arange(courses)
+    course_faculty = np.array(faculties)[course_ids % len(faculties)]
+    mapping = {f'Course {i}': faculty for i, faculty in zip(course_ids, course_faculty)}
+
+    course = rng.integers(0, courses, rows)
+    department = rng.integers(0, departments, rows)
+    faculty = course_faculty[course]
+    file_id = rng.permutation(rows) + 1_000_000
+    item = pd.Series(np.arange(rows)).astype('str')
+
+    def choice(values: list, p: list[float] | None = None) -> np.ndarray:
+        return rng.choice(np.array(values, dtype=object), rows, p=p)
+
+    def sometimes(values: pd.Series, missing: float) -> pd.Series:
+        return values.where(rng.random(rows) >= missing)
+
+    export = pd.DataFrame({
+        'Material id': np.arange(rows) + 1,
+        'Period': choice(periods),
+        'Department': pd.Series(faculty) + ' ' + pd.Series(department).astype('str') + ': Programme ' + pd.Series(department).astype('str'),
+        'Course code': 'C' + pd.Series(course).astype('str').str.zfill(6),
+        'Course name': 'Course ' + pd.Series(course).astype('str'),
+        'url': 'https://utwente.instructure.com/files/' + pd.Series(file_id).astype('str') + '?',
+        'Filename': 'file_' + item + '.pdf',
+        'Title': sometimes('Title of item ' + item, 0.1),
+        'Owner': sometimes(pd.Series(choice([f'Teacher {i}' for i in range(200)])), 0.05),
+        'Filetype': choice(['pdf', 'pptx', 'docx', 'xlsx'], p=[0.6, 0.25, 0.1, 0.05]),
+        'Classification': choice(CLASSIFICATIONS, p=[0.25, 0.3, 0.25, 0.1, 0.1]),
+        'Type': choice(['boek', 'artikel', 'overig']),
+        'ML Prediction': choice(ML_PREDICTIONS),
+        'Manual classification': sometimes(pd.Series(choice(MANUAL_CLASSIFICATIONS)), 0.7),
+        'Manual identifier': sometimes('MI' + item, 0.8),
+        'Scope': choice(['intern', 'extern']),
+        'Remarks': sometimes(pd.Series(choice(['checked', 'ask teacher', 'see manual sheet'])), 0.8),
+        'Auditor': sometimes(pd.Series(choice(['Auditor A', 'Auditor B', 'Auditor C'])), 0.5),
+        'Last change': pd.Series(pd.to_datetime('2023-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')).dt.strftime('%Y-%m-%d'),
+        'Status': choice(['Done', 'Pending', 'Deleted', 'Unknown'], p=[0.5, 0.3, 0.1, 0.1]),
+        'DOI': sometimes('10.1000/' + item, 0.7),
+        'Author': sometimes(pd.Series(choice([f'Author {i}' for i in range(500)])), 0.4),
+        'Publisher': sometimes(pd.Series(choice(['Elsevier', 'Springer', 'Wiley', 'Pearson', 'Sage'])), 0.4),
+        'Pages * Students': rng.integers(0, 20_000, rows),
+        'Google search file': sometimes('search_' + item + '.html', 0.5),
+    })
+    return export[[*EXPORT_DTYPES, 'Google search file']], mapping
+
+def make_manual_sheet(export: pd.DataFrame, share: float, rng: np.random.Generator, columns: list[str] = MANUAL_SHEET_COLUMNS) -> pd.DataFrame:
+    '''
+    returns a manual sheet for the items in export: a share of the items, with columns (some of MANUAL_SHEET_COLUMNS) in their order
+    '''
+    items = export.sample(frac=share, random_state=int(rng.integers(0, 2**31)))
+    rows = len(items)
+    yes_no = np.array(['Yes', 'No', 'yes', None], dtype=object)
+    values = {
+        'url_id_x': items['url'].str.extract(r'/files/(\d+)', expand=False).to_numpy(),
+        'Manual classification': rng.choice(np.array([*MANUAL_CLASSIFICATIONS, None], dtype=object), rows),
+        'Status': rng.choice(np.array(['Afgehandeld', 'Open', 'In behandeling'], dtype=object), rows),
+        'Own_work': rng.choice(yes_no, rows, p=[0.1, 0.6, 0.05, 0.25]),
+        'Free_for_use': rng.choice(yes_no, rows, p=[0.1, 0.6, 0.05, 0.25]),
+        'Suggested action': rng.choice(np.array(['remove', 'request license', 'shorten', None], dtype=object), rows),
+        'Extra notes': rng.choice(np.array(['contacted teacher', None], dtype=object), rows, p=[0.2, 0.8]),
+    }
+    return pd.DataFrame({column: values[column] for column in ['url_id_x', *columns]})
+
+def make_synthetic_data(output: str = 'synthetic_data',
+                        rows: int = 100_000,
+                        faculties: int = len(FACULTYNAMES),
+                        departments: int = 8,
+                        periods: int = 16,
+                        courses: int = 2_000,
+                        manual_share: float = 0.5,
+                        seed: int = 0) -> str:
+    '''
+    writes a synthetic copyright_export.csv, manual_sheets/<faculty>.csv and faculty_course_mapping.csv to the output dir.
+    faculties are named after FACULTYNAMES (FAC6, FAC7, ... for more faculties than that); departments is per faculty.
+    returns the output dir.
+    '''
+    rng = np.random.default_rng(seed)
+    faculty_names = [*FACULTYNAMES, *[f'FAC{i + 1}' for i in range(len(FACULTYNAMES), faculties)]][:faculties]
+    export, mapping = make_export(rows, faculty_names, departments, make_periods(periods), courses, rng)
+
+    os.makedirs(os.path.join(output, 'manual_sheets'), exist_ok=True)
+    export.to_csv(os.path.join(output, 'copyright_export.csv'), index=False)
+    faculty = export['Course name'].map(mapping)
+    for i, name in enumerate(faculty_names):
+        # the sheets of the faculties differ in practice: all but the first leave out one of the columns, in turn, and have their own order
+        columns = [column for column in MANUAL_SHEET_COLUMNS if i == 0 or column != MANUAL_SHEET_COLUMNS[(i - 1) % len(MANUAL_SHEET_COLUMNS)]]
+        columns = columns if i == 0 else list(rng.permutation(columns))
+        make_manual_sheet(export[faculty == name], manual_share, rng, columns).to_csv(os.path.join(output, 'manual_sheets', f'{name}.csv'), index=False)
+    pd.DataFrame({'Course code': ['C' + name.split(' ')[1].zfill(6) for name in mapping],
+                  'Course name': list(mapping),
+                  'faculty': list(mapping.values())}).to_csv(os.path.join(output, 'faculty_course_mapping.csv'), index=False)
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='generate a synthetic copyright export, manual sheets and faculty mapping')
+    parser.add_argument('--output', default='synthetic_data', help='directory to write the files to')
+    parser.add_argument('--rows', type=int, default=100_000, help='number of items in the export')
+    parser.add_argument('--faculties', type=int, default=len(FACULTYNAMES), help='number of faculties')
+    parser.add_argument('--departments', type=int, default=8, help='number of departments per faculty')
+    parser.add_argument('--periods', type=int, default=16, help='number of periods, the first ones are DEFAULT_PERIODS')
+    parser.add_argument('--courses', type=int, default=2_000, help='number of courses')
+    parser.add_argument('--manual-share', type=float, default=0.5, help='share of the items of each faculty that is in its manual sheet')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+    output = make_synthetic_data(output=args.output, rows=args.rows, faculties=args.faculties, departments=args.departments,
+                                 periods=args.periods, courses=args.courses, manual_share=args.manual_share, seed=args.seed)
+    print(f"synthetic data written to {output}")
@@ -0,0 +1,75 @@
+(() => {
+  // renders the .ea-table elements: the gzipped json payload is only decoded once a table is scrolled or tabbed into view
+  const tables = window.easyAccessTables = window.easyAccessTables || {seen: new WeakSet()};
+  const decode = async (element) => {
+    const base64 = document.getElementById(element.dataset.payload).textContent.trim();
+    const bytes = Uint8Array.from(atob(base64), (c) => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    const payload = JSON.parse(await new Response(stream).text());
+    const rows = payload.data.length ? payload.data[0].map((_, i) => payload.data.map((column) => column[i])) : [];
+    return {columns: payload.columns, rows: rows};
+  };
+  const text = (value) => (value === null || value === undefined ? '' : String(value));
+  const node = (tag, attributes, children) => {
+    const element = Object.assign(document.createElement(tag), attributes || {});
+    (children || []).forEach((child) => element.append(child));
+    return element;
+  };
+  const csv = (columns, rows) => [columns, ...rows].map((row) => row.map((value) => '"' + text(value).replace(/"/g, '""') + '"').join(',')).join('\r\n');
+  const render = (element, table) => {
+    const size = Number(element.dataset.pageSize);
+    const state = {page: 0, rows: table.rows};
+    const body = node('tbody');
+    const info = node('span', {className: 'ea-table-info'});
+    const previous = node('button', {className: 'btn btn-sm btn-outline-secondary', textContent: '‹', type: 'button'});
+    const next = node('button', {className: 'btn btn-sm btn-outline-secondary', textContent: '›', type: 'button'});
+    const search = node('input', {className: 'form-control form-control-sm', type: 'search', placeholder: 'Search'});
+    const download = node('button', {className: 'btn btn-sm btn-outline-secondary', textContent: 'csv', type: 'button'});
+    const show = () => {
+      const pages = Math.max(1, Math.ceil(state.rows.length / size));
+      state.page = Math.min(Math.max(state.page, 0), pages - 1);
+      const start = state.page * size;
+      body.replaceChildren(...state.rows.slice(start, start + size).map((row) => node('tr', {}, row.map((value) => node('td', {textContent: text(value)})))));
+      info.textContent = state.rows.length ? `${start + 1}–${Math.min(start + size, state.rows.length)} of ${state.rows.length}` : '0 items';
+      previous.disabled = state.page === 0;
+      next.disabled = state.page >= pages - 1;
+    };
+    previous.onclick = () => { state.page -= 1; show(); };
+    next.onclick = () => { state.page += 1; show(); };
+    search.oninput = () => {
+      const query = search.value.toLowerCase();
+      state.rows = query ? table.rows.filter((row) => row.some((value) => text(value).toLowerCase().includes(query))) : table.rows;
+      state.page = 0;
+      show();
+    };
+    download.onclick = () => {
+      const link = node('a', {href: URL.createObjectURL(new Blob([csv(table.columns, state.rows)], {type: 'text/csv'})), download: (element.dataset.name || 'table') + '.csv'});
+      link.click();
+      URL.revokeObjectURL(link.href);
+    };
+    const head = node('thead', {}, [node('tr', {}, table.columns.map((column) => node('th', {textContent: column})))]);
+    element.replaceChildren(
+      node('div', {className: 'ea-table-controls d-flex gap-2 mb-2'}, [search, previous, info, next, download]),
+      node('div', {className: 'table-responsive'}, [node('table', {className: 'table table-sm table-striped'}, [head, body])]),
+    );
+    show();
+  };
+  const observer = new IntersectionObserver((entries) => entries.forEach((entry) => {
+    if (!entry.isIntersecting) return;
+    observer.unobserve(entry.target);
+    decode(entry.target).then((table) => render(entry.target, table));
+  }));
+  // a saved page (single-file) contains the tables as they were rendered, without their event handlers: render them again
+  const observe = () => document.querySelectorAll('.ea-table').forEach((element) => {
+    if (tables.seen.has(element)) return;
+    tables.seen.add(element);
+    element.replaceChildren();
+    observer.observe(element);
+  });
+  // the script is in the head of the page, the tables follow in the body
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', observe);
+  } else {
+    observe();
+  }
+})();
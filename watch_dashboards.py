@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import glob
+import os
+import time
+from rich import print
+
+import make_report
+from make_report import FACULTYNAMES, DEFAULT_PERIODS, MAPPING_FILE, changed_faculties, create_qmd, get_faculty_mapping, load_export, save_dashboard_state
+from make_dashboards import render_dashboard
+
+'''
+Keeps the Easy Access dashboards up to date while their inputs are edited, e.g. by the reviewers during an audit round.
+Watches copyright_export.csv, faculty_course_mapping.csv and manual_sheets/*.csv, and rebuilds the dashboards of the faculties whose inputs changed.
+
+The export is loaded once and kept in memory. A changed manual sheet only rebuilds the qmd of its own faculty on top of it;
+a changed export or mapping is loaded again, after which the faculties whose items changed are rebuilt (see make_report.changed_faculties).
+Changes are debounced: a rebuild starts once the files have been left alone for --debounce seconds, so saving a sheet a few times in a row is one rebuild.
+The qmd files are built one at a time, the quarto renders are queued and run with at most --render-workers at the same time.
+The files are polled every --interval seconds, which works the same on every platform and on network drives.
+
+usage: python watch_dashboards.py [--faculties BMS ET] [--debounce 2] [--render-workers 2] [--no-render], stop with ctrl+c
+'''
+
+EXPORT_FILE = 'copyright_export.csv'
+MANUAL_SHEETS = os.path.join('manual_sheets', '*.csv')
+
+
+class DashboardWatcher:
+    '''
+    the state of the watch loop: the files as last seen, the faculties waiting to be built and the queued renders.
+    the arguments are those of make_dashboards.make_dashboards(); interval and debounce are in seconds.
+    '''
+
+    def __init__(self, faculties: list[str] | None = None, periods: list[str] | None = None, precompute: bool = True, compact: bool = False,
+                 paginate: bool = False, render: bool = True, render_workers: int = 2, quarto: str = 'quarto', single_file: str | None = 'single-file',
+                 interval: float = 0.5, debounce: float = 2.0):
+        self.faculties: list[str] = faculties if faculties else FACULTYNAMES
+        self.periods: list[str] = periods if periods else DEFAULT_PERIODS
+        self.precompute = precompute
+        self.compact = compact
+        self.paginate = paginate
+        self.render = render
+        self.render_workers = render_workers
+        self.quarto = quarto
+        self.single_file = single_file
+        self.interval = interval
+        self.debounce = debounce
+        self.stage = 'html' if render else 'qmd'
+        # faculties to check for changes + whether the export has to be loaded again first, see build()
+        self.pending: set[str] = set()
+        self.reload = False
+        # faculty -> fingerprint of the qmd waiting to be rendered, see render_worker()
+        self.queued: dict[str, str] = {}
+        # held while the qmd of a faculty is written or rendered
+        self.locks: dict[str, asyncio.Lock] = {faculty: asyncio.Lock() for faculty in self.faculties}
+        self.changes = asyncio.Event()
+        self.renders: asyncio.Queue[str] = asyncio.Queue()
+
+    def files(self) -> dict[str, tuple[int, int]]:
+        '''
+        returns {path: (mtime, size)} for the watched files that exist
+        '''
+        files = {}
+        for path in [EXPORT_FILE, MAPPING_FILE, *glob.glob(MANUAL_SHEETS)]:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[os.path.normpath(path)] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def affected(self, paths: set[str]) -> tuple[set[str], bool]:
+        '''
+        returns the faculties affected by the changed files in paths + whether the export has to be loaded again
+        '''
+        if paths & {os.path.normpath(EXPORT_FILE), os.path.normpath(MAPPING_FILE)}:
+            return set(self.faculties), True
+        return {os.path.splitext(os.path.basename(path))[0] for path in paths} & set(self.faculties), False
+
+    def load(self, reload: bool = False) -> None:
+        '''
+        loads the export into memory, where create_qmd() finds it (see make_report.load_export).
+        with reload, the export and the mapping kept in memory are dropped and read again
+        '''
+        if reload:
+            make_report._loaded_exports.clear()
+            make_report._faculty_mappings.clear()
+        load_export(EXPORT_FILE, self.periods, get_faculty_mapping(), compact=self.compact)
+
+    async def watch(self) -> None:
+        '''
+        polls the watched files, and hands the faculties they affect to build() once they haven't changed for self.debounce seconds
+        '''
+        seen = self.files()
+        changed: set[str] = set()
+        last_change = 0.0
+        while True:
+            await asyncio.sleep(self.interval)
+            files = self.files()
+            paths = {path for path in files.keys() | seen.keys() if files.get(path) != seen.get(path)}
+            seen = files
+            if paths:
+                changed |= paths
+                last_change = time.monotonic()
+            elif changed and time.monotonic() - last_change >= self.debounce:
+                print(f"changed: {', '.join(sorted(changed))}")
+                faculties, reload = self.affected(changed)
+                changed = set()
+                self.pending |= faculties
+                self.reload |= reload
+                self.changes.set()
+
+    async def build(self) -> None:
+        '''
+        builds the qmd files of the pending faculties whose inputs changed since their last build, one at a time, and queues their renders
+        '''
+        while True:
+            await self.changes.wait()
+            self.changes.clear()
+            faculties = [faculty for faculty in self.faculties if faculty in self.pending]
+            reload, self.pending, self.reload = self.reload, set(), False
+            try:
+                if reload:
+                    await asyncio.to_thread(self.load, True)
+                fingerprints = await asyncio.to_thread(changed_faculties, faculties, self.periods, precompute=self.precompute, stage=self.stage,
+                                                       compact=self.compact, paginate=self.paginate)
+            except Exception as e:
+                print(f"error loading {EXPORT_FILE} with {MAPPING_FILE}: {e}")
+                continue
+            for faculty in faculties:
+                if faculty not in fingerprints:
+                    print(f"{faculty}: unchanged")
+                    continue
+                start = time.perf_counter()
+                async with self.locks[faculty]:
+                    try:
+                        await asyncio.to_thread(create_qmd, faculty, self.periods, precompute=self.precompute, compact=self.compact, paginate=self.paginate)
+                    except Exception as e:
+                        print(f"error building {faculty}: {e}")
+                        continue
+                print(f"{faculty}: qmd built in {time.perf_counter() - start:.1f}s")
+                if not self.render:
+                    save_dashboard_state(self.stage, {faculty: fingerprints[faculty]})
+                elif faculty not in self.queued:
+                    self.queued[faculty] = fingerprints[faculty]
+                    self.renders.put_nowait(faculty)
+                else:
+                    # already waiting for a render, which will pick up the new qmd
+                    self.queued[faculty] = fingerprints[faculty]
+
+    async def render_worker(self) -> None:
+        '''
+        renders the queued dashboards, self.render_workers of these run at the same time
+        '''
+        while True:
+            faculty = await self.renders.get()
+            async with self.locks[faculty]:
+                # taken once the lock is held: a qmd built while waiting for it is rendered now, and not queued for another render
+                fingerprint = self.queued.pop(faculty)
+                try:
+                    seconds = await asyncio.to_thread(render_dashboard, faculty, self.quarto, self.single_file, self.paginate)
+                except Exception as e:
+                    print(f"error rendering {faculty}: {e}")
+                    continue
+            # saved from the event loop only, so the renders don't overwrite each other's state
+            save_dashboard_state(self.stage, {faculty: fingerprint})
+            print(f"{faculty}: rendered in {seconds:.1f}s")
+
+    async def run(self) -> None:
+        '''
+        loads the export, brings the dashboards that are out of date up to date and keeps watching for changes until cancelled
+        '''
+        start = time.perf_counter()
+        await asyncio.to_thread(self.load)
+        print(f"{EXPORT_FILE} loaded in {time.perf_counter() - start:.1f}s, watching {EXPORT_FILE}, {MAPPING_FILE} and {MANUAL_SHEETS}")
+        self.pending = set(self.faculties)
+        self.changes.set()
+        workers = [self.render_worker() for _ in range(self.render_workers if self.render else 0)]
+        await asyncio.gather(self.watch(), self.build(), *workers)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='rebuild the Easy Access dashboards whenever the export, the mapping or a manual sheet changes')
+    parser.add_argument('--faculties', nargs='+', default=FACULTYNAMES, help='faculties to keep up to date (default: FACULTYNAMES in make_report.py)')
+    parser.add_argument('--periods', nargs='+', default=DEFAULT_PERIODS, help='periods to include')
+    parser.add_argument('--no-precompute', action='store_true', help='let quarto process the copyright data while rendering, instead of loading precomputed tables')
+    parser.add_argument('--render-workers', type=int, default=2, help='number of quarto renders running at the same time')
+    parser.add_argument('--no-render', action='store_true', help='only create the qmd files')
+    parser.add_argument('--quarto', default='quarto', help='quarto executable')
+    parser.add_argument('--single-file', default='single-file', help="single-file executable, or '' to skip inlining")
+    parser.add_argument('--compact', action='store_true', help='keep the export in memory in compact form, see make_report.compact_export')
+    parser.add_argument('--paginate', action='store_true', help='embed the tables as compressed payloads shown in pages, for faculties with many items')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between checks of the watched files')
+    parser.add_argument('--debounce', type=float, default=2.0, help='seconds the files have to be left alone before the dashboards are rebuilt')
+    args = parser.parse_args()
+    watcher = DashboardWatcher(faculties=args.faculties,
+                               periods=args.periods,
+                               precompute=not args.no_precompute,
+                               compact=args.compact,
+                               paginate=args.paginate,
+                               render=not args.no_render,
+                               render_workers=args.render_workers,
+                               quarto=args.quarto,
+                               single_file=args.single_file or None,
+                               interval=args.interval,
+                               debounce=args.debounce)
+    try:
+        asyncio.run(watcher.run())
+    except KeyboardInterrupt:
+        print('stopped watching')